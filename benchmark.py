@@ -0,0 +1,181 @@
+"""
+Reproducible performance benchmark for simulation, pairing and ranking.
+
+Runs seeded tournaments over a grid of player counts and draw percentages and
+writes the timings as JSON. Every case runs --repeat times and the best run
+counts. With --compare, the results are checked against a stored baseline and
+the run fails when a metric got slower than the threshold and by more than the
+absolute floor (--min-seconds, --min-memory-mb).
+
+    python benchmark.py --players 64 1024 16384 --output bench.json
+    python benchmark.py --compare bench.json
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+from simulation_hooks import RoundEvent, SimulationListener
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+DEFAULT_PLAYERS = [64, 256, 1024, 4096, 16384, 65536, 262144, 1048576]
+DEFAULT_DRAWS = [0, 10]
+COMPARED_METRICS = ["total_seconds", "pairing_seconds", "ranking_seconds", "peak_memory_mb"]
+
+class RoundCollector(SimulationListener):
+    """Keeps the RoundEvent of every round."""
+    def __init__(self):
+        self.events: List[RoundEvent] = []
+
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        self.events.append(event)
+
+def run_case(number_of_players: int, draw_percentage: int, seed: int,
+             pairing: str, storage: str, history: str) -> Dict:
+    """Run one seeded tournament and measure it. Meant to run in a fresh process."""
+    # Imported here so the parent process stays small and the memory peak is per case
+    from tournament import Tournament
+    from tournament_simulation import Simulation
+
+    rounds = RoundCollector()
+
+    start = time.perf_counter()
+    tournament = Tournament(number_of_players, draw_percentage, storage)
+    setup_seconds = time.perf_counter() - start
+
+    simulation = Simulation(tournament, pairing, history=history, listeners=[rounds], seed=seed)
+    start = time.perf_counter()
+    simulation.simulate()
+    simulate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tournament.get_rankings()
+    ranking_seconds = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_memory_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    return {
+        "players": number_of_players,
+        "draw_percentage": draw_percentage,
+        "pairing": pairing,
+        "storage": storage,
+        "history": history,
+        "seed": seed,
+        "rounds": tournament.number_of_rounds,
+        "matches": simulation.match_count,
+        "setup_seconds": setup_seconds,
+        "round_seconds": [event.seconds for event in rounds.events],
+        "pairing_seconds": sum(event.phase_seconds["pairing"] for event in rounds.events),
+        "unpaired": sum(event.unpaired for event in rounds.events),
+        "simulate_seconds": simulate_seconds,
+        "ranking_seconds": ranking_seconds,
+        "total_seconds": setup_seconds + simulate_seconds + ranking_seconds,
+        "peak_memory_mb": peak_memory_mb,
+    }
+
+def run_benchmarks(players: List[int], draws: List[int], seed: int, pairing: str,
+                   storage: str, history: str, repeat: int = 5) -> Dict:
+    """
+    Run every case of the grid repeat times, each run in its own process.
+    The compared metrics keep their best (lowest) run, which is the least
+    disturbed by other load on the machine; every run is kept under "samples".
+    """
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for number_of_players in players:
+        for draw_percentage in draws:
+            runs = []
+            for _ in range(repeat):
+                # A fresh process per run keeps memory peaks and caches independent
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    runs.append(executor.submit(run_case, number_of_players, draw_percentage,
+                                                seed, pairing, storage, history).result())
+            result = min(runs, key=lambda run: run["total_seconds"])
+            for metric in COMPARED_METRICS:
+                result[metric] = min(run[metric] for run in runs)
+            result["repeat"] = repeat
+            result["samples"] = {metric: [run[metric] for run in runs] for metric in COMPARED_METRICS}
+            print(f"{number_of_players} players, {draw_percentage}% draws (best of {repeat}): "
+                  f"{result['total_seconds']:.2f}s total, {result['pairing_seconds']:.2f}s pairing, "
+                  f"{result['ranking_seconds']:.2f}s ranking, {result['peak_memory_mb']:.0f} MB")
+            results.append(result)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def _case_key(result: Dict) -> tuple:
+    return (result["players"], result["draw_percentage"], result["pairing"],
+            result["storage"], result["history"], result["seed"])
+
+def compare(current: Dict, baseline: Dict, threshold: float,
+            min_seconds: float = 0.05, min_memory_mb: float = 8.0) -> List[str]:
+    """
+    List the metrics that got worse than the baseline by more than threshold (0.1 = 10%).
+    A metric must also have grown by at least min_seconds (min_memory_mb for
+    memory), so that short timings can't fail the comparison on noise alone.
+    """
+    baseline_cases = {_case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        base = baseline_cases.get(_case_key(result))
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            floor = min_memory_mb if metric == "peak_memory_mb" else min_seconds
+            if (base[metric] > 0 and result[metric] > base[metric] * (1 + threshold)
+                    and result[metric] - base[metric] > floor):
+                regressions.append(
+                    f"{result['players']} players, {result['draw_percentage']}% draws: {metric} "
+                    f"{base[metric]:.3f} -> {result[metric]:.3f} (+{result[metric] / base[metric] - 1:.0%})")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark tournament simulation, pairing and ranking.")
+    parser.add_argument("--players", type=int, nargs="+", default=DEFAULT_PLAYERS)
+    parser.add_argument("--draws", type=int, nargs="+", default=DEFAULT_DRAWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pairing", default="bucket")
+    parser.add_argument("--storage", default="objects")
+    parser.add_argument("--history", default="stats")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown before a metric counts as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Smallest slowdown in seconds that counts as a regression")
+    parser.add_argument("--min-memory-mb", type=float, default=8.0,
+                        help="Smallest memory growth in MB that counts as a regression")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the best run is compared")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    current = run_benchmarks(args.players, args.draws, args.seed, args.pairing, args.storage, args.history,
+                             args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold, args.min_seconds, args.min_memory_mb)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
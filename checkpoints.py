@@ -0,0 +1,146 @@
+from typing import Dict, List, Optional, Union
+from match_history import RECORD_DTYPE, matches_to_records
+from simulation_hooks import RoundEvent, SimulationListener
+from tournament import Tournament
+from tournament_simulation import Simulation
+import json
+import numpy as np
+
+# Length of a random.Random (Mersenne Twister) state: 624 words and the position
+RNG_STATE_SIZE = 625
+
+class Checkpoints(SimulationListener):
+    """
+    Checkpoint after every round of a simulation, to branch new simulations from.
+
+    Checkpoints are delta encoded: all of them share one array of match records
+    (see match_history.RECORD_DTYPE) and each round only adds its own matches,
+    the RNG state at its end and its unpaired count. Player counters, opponents,
+    rematch index and byes of a round are rebuilt by recording the matches up
+    to it, which is much cheaper than pairing and playing those rounds again.
+
+    Attach it before the simulation starts; the history has to keep matches
+    ("memory" or "disk").
+
+        checkpoints = Checkpoints()
+        Simulation(tournament, "bucket", listeners=[checkpoints], seed=1).simulate()
+        branch = checkpoints.branch(5, seed=2)  # Same first 5 rounds, different rest
+        branch.simulate(first_round=6)
+    """
+    def __init__(self):
+        self.params: Dict = {}
+        self.round_ends: List[int] = []  # End index into records of every round
+        self.rng_states: List[np.ndarray] = []  # After round 0 (the start), 1, 2, ...
+        self.unpaired: List[int] = []
+        self._chunks: List[np.ndarray] = []
+        self._records: Optional[np.ndarray] = np.empty(0, dtype=RECORD_DTYPE)
+
+    @property
+    def last_round(self) -> int:
+        """Last round with a checkpoint."""
+        return len(self.round_ends)
+
+    @property
+    def records(self) -> np.ndarray:
+        """Match records of all checkpointed rounds, in order."""
+        if self._records is None:
+            self._records = np.concatenate(self._chunks)
+            self._chunks = [self._records]
+        return self._records
+
+    def on_simulation_start(self, simulation) -> None:
+        if not simulation.history.keeps_matches:
+            raise ValueError("Checkpoints need a history that keeps matches")
+        if simulation.current_round != 0:
+            raise ValueError("Checkpoints have to be attached from the first round on")
+        tournament = simulation.tournament
+        self.params = {
+            "players": tournament.number_of_players,
+            "draw_percentage": tournament.draw_percentage,
+            "rounds": tournament.number_of_rounds,
+            "pairing": simulation.pairing,
+            "seed": simulation.seed,
+        }
+        self.round_ends = []
+        self.rng_states = [self._rng_state(simulation)]
+        self.unpaired = [0]
+        self._chunks = []
+        self._records = np.empty(0, dtype=RECORD_DTYPE)
+
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        records = matches_to_records(simulation.history.round_matches(event.round_number))
+        start = self.round_ends[-1] if self.round_ends else 0
+        self._chunks.append(records)
+        self._records = None
+        self.round_ends.append(start + len(records))
+        self.rng_states.append(self._rng_state(simulation))
+        self.unpaired.append(simulation.unpaired)
+
+    def _rng_state(self, simulation) -> np.ndarray:
+        version, state, _ = simulation.rng.getstate()
+        if version != 3 or len(state) != RNG_STATE_SIZE:
+            raise ValueError("Unsupported random state")
+        return np.array(state, dtype=np.uint32)
+
+    def round_records(self, round_number: int) -> np.ndarray:
+        """Match records of one round."""
+        start = self.round_ends[round_number - 2] if round_number > 1 else 0
+        return self.records[start:self.round_ends[round_number - 1]]
+
+    def branch(self, round_number: int, seed: Optional[Union[int, str]] = None, history: str = "stats",
+               listeners: Optional[List[SimulationListener]] = None, storage: str = "objects") -> Simulation:
+        """
+        A new simulation in the state after the given round (0 for the start).
+        Without a seed it continues with the RNG state of the original run, so
+        simulating the remaining rounds gives the original results; with a seed
+        the remaining rounds play out differently. Continue it with
+        simulate(first_round=round_number + 1).
+        """
+        if not 0 <= round_number <= self.last_round:
+            raise ValueError(f"No checkpoint for round {round_number}, the last one is {self.last_round}")
+        params = self.params
+        tournament = Tournament(params["players"], params["draw_percentage"], storage,
+                                number_of_rounds=params["rounds"])
+        simulation = Simulation(tournament, params["pairing"], history=history, listeners=listeners,
+                                seed=params["seed"] if seed is None else seed)
+        if seed is None:
+            simulation.rng.setstate((3, tuple(self.rng_states[round_number].tolist()), None))
+
+        end = self.round_ends[round_number - 1] if round_number > 0 else 0
+        tournament.load_records(self.records[:end])
+        history = simulation.history
+        for current_round in range(1, round_number + 1):
+            history.record_records(self.round_records(current_round))
+            history.end_round(current_round)
+        if history.keeps_player_history and tournament.player_store is None:
+            for match in history.matches:
+                match.player1.match_history.append(match)
+                if match.player2 is not None:
+                    match.player2.match_history.append(match)
+        simulation.current_round = round_number
+        simulation.unpaired = self.unpaired[round_number]
+        return simulation
+
+    def save(self, path: str) -> None:
+        """Write all checkpoints to a single .npz file."""
+        np.savez_compressed(
+            path,
+            params=np.array(json.dumps(self.params)),
+            records=self.records,
+            round_ends=np.array(self.round_ends, dtype=np.int64),
+            rng_states=np.array(self.rng_states, dtype=np.uint32).reshape(-1, RNG_STATE_SIZE),
+            unpaired=np.array(self.unpaired, dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'Checkpoints':
+        """Read checkpoints written by save."""
+        checkpoints = cls()
+        with np.load(path) as data:
+            checkpoints.params = json.loads(str(data["params"]))
+            checkpoints._chunks = [data["records"]]
+            checkpoints._records = None
+            checkpoints.round_ends = data["round_ends"].tolist()
+            checkpoints.rng_states = list(data["rng_states"])
+            checkpoints.unpaired = data["unpaired"].tolist()
+        return checkpoints
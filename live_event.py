@@ -0,0 +1,249 @@
+"""
+Live-event mode: record the results of a real event as they come in and
+project the remaining rounds.
+
+Results are rows with the keys round, player1, player2 and winner. player2 is
+empty for a bye and winner is empty (or "draw") for a draw. They can be read
+from CSV, JSON (a list of rows) or JSON lines files; reading a file again only
+adds the rows that weren't recorded yet, so a growing results file can simply
+be ingested after every update.
+
+    event = LiveEvent(["alice", "bob", ...], draw_percentage=5, number_of_rounds=8)
+    event.ingest_file("results.csv")
+    event.standings(limit=8)
+    event.project(cut=8, runs=500).odds()
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from match_history import RECORD_DTYPE, records_to_matches
+from monte_carlo import run_seed
+from results_store import ResultsStore
+from tournament import Tournament
+from tournament_simulation import Simulation
+from vectorized_simulation import BatchSimulation
+import csv
+import json
+import numpy as np
+import os
+
+class Projection:
+    """
+    Outcome of projecting the remaining rounds many times:
+    - made_cut: per player index, in how many runs the player made the cut
+    - cut_points: histogram of the points of the last player making the cut
+    """
+    def __init__(self, player_ids: Sequence[str], cut: int):
+        self.player_ids = player_ids
+        self.cut = cut
+        self.runs = 0
+        self.made_cut = np.zeros(len(player_ids), dtype=np.int64)
+        self.cut_points: Counter = Counter()
+
+    def merge(self, other: 'Projection') -> None:
+        """Merge the runs of another batch into this one."""
+        self.runs += other.runs
+        self.made_cut += other.made_cut
+        self.cut_points.update(other.cut_points)
+
+    def odds(self) -> Dict[str, float]:
+        """Probability of making the cut for each player, best odds first."""
+        order = np.argsort(-self.made_cut, kind='stable')
+        made_cut = self.made_cut.tolist()
+        return {self.player_ids[i]: made_cut[i] / max(self.runs, 1) for i in order.tolist()}
+
+    def cut_line_distribution(self) -> Dict[int, float]:
+        """Probability that the cut ends on each point total."""
+        return {points: count / self.runs for points, count in sorted(self.cut_points.items())}
+
+def _project_runs(records: np.ndarray, player_ids: Sequence[str], draw_percentage: int, number_of_rounds: int,
+                  cut: int, pairing: str, first_round: int, base_seed: int, run_indices: List[int]) -> Projection:
+    """Replay the recorded results and simulate the remaining rounds for the given runs."""
+    projection = Projection(player_ids, cut)
+    for run_index in run_indices:
+        tournament = Tournament(len(player_ids), draw_percentage, number_of_rounds=number_of_rounds)
+        tournament.load_records(records)
+        simulation = Simulation(tournament, pairing, history="stats", seed=run_seed(base_seed, run_index))
+        simulation.simulate(first_round)
+        rankings = tournament.rankings()
+        top = rankings.top_indices(cut)
+        projection.made_cut[top] += 1
+        if cut <= len(rankings):
+            projection.cut_points[int(rankings.points[top[-1]])] += 1
+        projection.runs += 1
+    return projection
+
+class LiveEvent:
+    """
+    A real event: players are known by their own ids and results are recorded
+    round by round. Standings and tiebreakers update incrementally, through the
+    tournament's refresh of only the players a new result affects.
+
+    Simulation's result model lets the lower player index win, so list the
+    player ids strongest first (e.g. by rating or seeding) for projections.
+    """
+    PROJECTION_ENGINES = ("batch", "simulation")
+
+    def __init__(self, player_ids: Sequence, draw_percentage: int = 0, number_of_rounds: Optional[int] = None):
+        self.player_ids = [str(player_id) for player_id in player_ids]
+        self.index = {player_id: i for i, player_id in enumerate(self.player_ids)}
+        if len(self.index) != len(self.player_ids):
+            raise ValueError("Player ids must be unique")
+        self.tournament = Tournament(len(self.player_ids), draw_percentage, number_of_rounds=number_of_rounds)
+        self.current_round = 0
+        self._records: List[Tuple[int, int, int, int]] = []  # In RECORD_DTYPE order
+        # (round, player index) -> (opponent index, winner index) of every recorded result
+        self._recorded: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+    def _player_index(self, player_id) -> int:
+        try:
+            return self.index[str(player_id)]
+        except KeyError:
+            raise ValueError(f"Unknown player: {player_id}") from None
+
+    def record_result(self, round_number: int, player1, player2=None, winner=None) -> bool:
+        """
+        Record one result; player2 None is a bye and winner None a draw.
+        Returns False when the same result was already recorded.
+        """
+        round_number = int(round_number)
+        if round_number < 1:
+            raise ValueError(f"Round {round_number}: rounds start at 1")
+        index1 = self._player_index(player1)
+        index2 = self._player_index(player2) if player2 is not None else -1
+        if index1 == index2:
+            raise ValueError(f"Round {round_number}: {player1} can't play against themselves")
+        if player2 is None:
+            winner_index = index1
+        elif winner is None:
+            winner_index = -1
+        else:
+            winner_index = self._player_index(winner)
+            if winner_index not in (index1, index2):
+                raise ValueError(f"Round {round_number}: winner {winner} didn't play {player1} vs {player2}")
+
+        previous = self._recorded.get((round_number, index1))
+        if previous is not None:
+            if previous != (index2, winner_index):
+                raise ValueError(f"Round {round_number}: conflicting result for {player1}")
+            return False
+        if index2 >= 0 and (round_number, index2) in self._recorded:
+            raise ValueError(f"Round {round_number}: {player2} already has a result")
+        if round_number < self.current_round:
+            raise ValueError(f"Round {round_number} result arrived after round {self.current_round} started")
+        if self.tournament.number_of_rounds < round_number:
+            raise ValueError(f"Round {round_number} is past the last round {self.tournament.number_of_rounds}")
+
+        self.current_round = round_number
+
+        record = (index1, index2, winner_index, round_number)
+        match, = records_to_matches(np.array([record], dtype=RECORD_DTYPE), self.tournament.players)
+        self._records.append(record)
+        match.player1.record_match(match)
+        if match.player2 is not None:
+            match.player2.record_match(match)
+        self._recorded[(round_number, index1)] = (index2, winner_index)
+        if index2 >= 0:
+            self._recorded[(round_number, index2)] = (index1, winner_index)
+        return True
+
+    def ingest(self, rows: Iterable[Dict]) -> int:
+        """Record result rows (see the module docstring). Returns how many were new."""
+        added = 0
+        for row in rows:
+            player2 = row.get("player2") or None
+            winner = row.get("winner") or None
+            if winner == "draw":
+                winner = None
+            if self.record_result(row["round"], row["player1"], player2, winner):
+                added += 1
+        return added
+
+    def ingest_file(self, path: str) -> int:
+        """Record the results in a .csv, .json or .jsonl file. Returns how many were new."""
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, newline="") as f:
+            if extension == ".csv":
+                return self.ingest(csv.DictReader(f))
+            if extension == ".json":
+                return self.ingest(json.load(f))
+            if extension == ".jsonl":
+                return self.ingest(json.loads(line) for line in f if line.strip())
+        raise ValueError(f"Unknown results file type: {extension}")
+
+    def records(self) -> np.ndarray:
+        """All recorded results as match records, in round order."""
+        return np.array(self._records, dtype=RECORD_DTYPE)
+
+    def results(self) -> ResultsStore:
+        """The recorded results indexed by round, player and points."""
+        store = ResultsStore(self.tournament.players)
+        records = self.records()
+        rounds = records['round_number']
+        for round_number in np.unique(rounds).tolist():
+            store.add_records(round_number, records[rounds == round_number])
+        return store
+
+    def standings(self, limit: Optional[int] = None) -> List[Dict]:
+        """Current standings, best first; only the top limit players when given."""
+        rankings = self.tournament.rankings()
+        indices = rankings.top_indices(limit) if limit is not None else rankings.order()
+        standings = []
+        for rank, index in enumerate(indices.tolist(), 1):
+            player = self.tournament.players[index]
+            standings.append({
+                "rank": rank,
+                "player": self.player_ids[index],
+                "points": player.get_points(),
+                "record": f"{player.wins}-{player.losses}-{player.draws}",
+                "tiebreaker": player.calculate_tiebreaker(),
+            })
+        return standings
+
+    def project(self, cut: int = 8, runs: int = 200, base_seed: int = 0, engine: str = "batch",
+                pairing: str = "bucket", max_workers: Optional[int] = None) -> Projection:
+        """
+        Simulate the rounds after the current one runs times, starting from the
+        results recorded so far, and count how often each player makes the cut.
+        Record the current round completely before projecting.
+
+        engine "batch" plays all runs in lockstep with BatchSimulation, which takes
+        seconds for thousands of players; "simulation" replays the results into a
+        Simulation per run on a process pool, with its exact pairing rules.
+        """
+        if engine not in self.PROJECTION_ENGINES:
+            raise ValueError(f"Unknown projection engine: {engine}")
+        records = self.records()
+        tournament = self.tournament
+        first_round = self.current_round + 1
+        projection = Projection(self.player_ids, cut)
+        if engine == "batch":
+            batch = BatchSimulation(tournament.number_of_players, tournament.draw_percentage, runs,
+                                    seed=base_seed, number_of_rounds=tournament.number_of_rounds)
+            batch.load_records(records)
+            batch.simulate(first_round)
+            top = batch.top_indices(cut)
+            projection.runs = runs
+            projection.made_cut += np.bincount(top.ravel(), minlength=tournament.number_of_players)
+            if cut <= tournament.number_of_players:
+                points = batch.get_points()[np.arange(runs), top[:, -1]]
+                projection.cut_points.update(points.tolist())
+            return projection
+
+        max_workers = max_workers or os.cpu_count() or 1
+        chunk_count = max(min(runs, max_workers * 4), 1)
+        chunks = [list(range(i, runs, chunk_count)) for i in range(chunk_count)]
+        if max_workers == 1:
+            for chunk in chunks:
+                projection.merge(_project_runs(records, self.player_ids, tournament.draw_percentage,
+                                               tournament.number_of_rounds, cut, pairing,
+                                               first_round, base_seed, chunk))
+            return projection
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_project_runs, records, self.player_ids, tournament.draw_percentage,
+                                       tournament.number_of_rounds, cut, pairing, first_round, base_seed, chunk)
+                       for chunk in chunks]
+            for future in futures:
+                projection.merge(future.result())
+        return projection
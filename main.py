@@ -1,105 +1,135 @@
 import streamlit as st
 from tournament import Tournament
 from tournament_simulation import Simulation
+from simulation_worker import SimulationRunner
+from result_cache import ResultCache
+from results_store import ResultsStore
+import numpy as np
 import pandas as pd
-import time
 
-def display_round_results(matches, round_number):
-    """Display the results of matches for a specific round."""
-    # Create an expander for this round
-    with st.expander(f"### Round {round_number} Results", expanded=False):
-        for match in matches:
-            if match.player2 is None:
-                st.write(f"🎯 Player {match.player1.player_id} received a bye")
-            else:
-                if match.result is None:
-                    result_text = f"🤝 Player {match.player1.player_id} drew with Player {match.player2.player_id}"
-                else:
-                    winner_id = match.result.player_id
-                    loser_id = match.player2.player_id if match.result == match.player1 else match.player1.player_id
-                    result_text = f"🏆 Player {winner_id} defeated Player {loser_id}"
-                st.write(result_text)
+PAGE_SIZE = 50
 
-def display_player_match_history(st, player):
+def page_bounds(total_rows, key, page_size=PAGE_SIZE):
+    """Show a page selector for a table of total_rows rows and return the (start, end) rows of the page."""
+    pages = max((total_rows + page_size - 1) // page_size, 1)
+    if pages == 1:
+        return 0, total_rows
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=key)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total_rows)
+
+def match_text(player1, player2, result):
+    """Describe a match given as the player ids of a match record."""
+    if player2 < 0:
+        return f"🎯 Player {player1} received a bye"
+    if result < 0:
+        return f"🤝 Player {player1} drew with Player {player2}"
+    loser = player2 if result == player1 else player1
+    return f"🏆 Player {result} defeated Player {loser}"
+
+@st.cache_data(max_entries=256)
+def round_results_page(params, round_number, player_id, start, end, _results):
+    """
+    Rows of one page of a round's results. Simulations are deterministic for
+    the same params, so pages are cached by them and shared between reruns.
+    """
+    records = _results.round_records(round_number, player_id)[start:end]
+    return pd.DataFrame({"Result": [match_text(*record[:3]) for record in records.tolist()]})
+
+def display_round_results(results, params):
+    """Display the results of one round at a time, a page of matches at a time."""
+    round_numbers = results.round_numbers()
+    if not round_numbers:
+        return
+    round_number = st.selectbox("Round", round_numbers, index=len(round_numbers) - 1, key="results_round")
+    player_filter = st.text_input("Only matches of Player ID", key="results_player").strip()
+    player_id = None
+    if player_filter:
+        if not player_filter.isdigit():
+            st.warning("Player ID must be a number")
+            return
+        player_id = int(player_filter)
+    total_rows = len(results.round_records(round_number, player_id))
+    st.write(f"### Round {round_number} Results ({total_rows} matches)")
+    start, end = page_bounds(total_rows, key=f"results_page_{round_number}_{player_id}")
+    st.dataframe(round_results_page(params, round_number, player_id, start, end, results),
+                 width="stretch", hide_index=True)
+
+def display_player_match_history(st, player, results):
     """Display all matches for a specific player."""
     if player is None:
         return
         
     st.write(f"### Match History for Player {player.player_id}")
     
-    # Group matches by round
-    matches_by_round = {}
-    for match in player.match_history:
-        round_num = match.round_number
-        if round_num not in matches_by_round:
-            matches_by_round[round_num] = []
-        matches_by_round[round_num].append(match)
-    
-    # Display each round's matches
-    for round_num in sorted(matches_by_round.keys()):
-        with st.expander(f"Round {round_num}", expanded=False):
-            for match in matches_by_round[round_num]:
-                if match.player2 is None:
-                    st.write("🎯 Received a bye")
+    # Display each round's match, the results store keeps them in round order
+    for match in results.player_matches(player.player_id):
+        with st.expander(f"Round {match.round_number}", expanded=False):
+            if match.player2 is None:
+                st.write("🎯 Received a bye")
+            else:
+                # Determine if this player won, lost, or drew
+                if match.result is None:
+                    result = "🤝 Drew"
                 else:
-                    # Determine if this player won, lost, or drew
-                    if match.result is None:
-                        result = "🤝 Drew"
+                    if match.result == player:
+                        result = "🏆 Won"
                     else:
-                        if match.result == player:
-                            result = "🏆 Won"
-                        else:
-                            result = "❌ Lost"
-                    
-                    # Show opponent
-                    opponent = match.player2 if match.player1 == player else match.player1
-                    if opponent:  # Add null check
-                        st.write(f"{result} vs Player {opponent.player_id}")
-
-def display_player_stats(players, limit=128):
+                        result = "❌ Lost"
+                
+                # Show opponent
+                opponent = match.player2 if match.player1 == player else match.player1
+                if opponent:  # Add null check
+                    st.write(f"{result} vs Player {opponent.player_id}")
+
+@st.cache_data(max_entries=256)
+def standings_page(params, points, start, end, _rankings):
     """
-    Display the statistics for players.
-    By default shows top 128 players with option to see all.
+    Rows of one page of the standings, only players on the given points when
+    points isn't None. Only the rows of the page are built, and pages are
+    cached by the simulation params like round_results_page.
     """
-    st.write("### Final Standings")
-    
-    # Get sorted players
-    sorted_players = sorted(
-        players,
-        key=lambda p: (p.get_points(), p.calculate_tiebreaker()) if p is not None else (0, "0"),
-        reverse=True
-    )
-    
-    # Create a table of player statistics
+    order = _rankings.order()
+    if points is None:
+        positions = np.arange(start, end)
+    else:
+        positions = np.flatnonzero(_rankings.points[order] == points)[start:end]
+    players = _rankings.players
     stats_data = []
-    for rank, player in enumerate(sorted_players, 1):
-        if player is None:
-            continue
-            
-        tiebreaker = player.calculate_tiebreaker()
-        points = player.get_points()
-        
+    for position, index in zip(positions.tolist(), order[positions].tolist()):
+        player = players[index]
         stats_data.append({
-            "Rank": rank,
+            "Rank": position + 1,
             "Player": f"Player {player.player_id}",
-            "Points": points,
+            "Points": player.get_points(),
             "W/L/D": f"{player.wins}/{player.losses}/{player.draws}",
-            "Tiebreaker": tiebreaker
+            "Tiebreaker": player.calculate_tiebreaker()
         })
+    return pd.DataFrame(stats_data, columns=["Rank", "Player", "Points", "W/L/D", "Tiebreaker"])
+
+def display_player_stats(rankings, results, params):
+    """
+    Display the statistics for players, a page at a time.
+    Optionally only the players on one point total.
+    """
+    st.write("### Final Standings")
     
-    # Convert to DataFrame
-    df = pd.DataFrame(stats_data)
-    
-    # Show limited number of players by default
-    if len(stats_data) > limit and not st.session_state.get('show_all_players', False):
-        displayed_df = df.head(limit)
-    else:
-        displayed_df = df
+    point_totals = results.point_totals()
+    options = [None] + sorted(point_totals, reverse=True)
+    points = st.selectbox(
+        "Points",
+        options,
+        format_func=lambda total: "All players" if total is None else f"{total} points ({point_totals[total]} players)",
+        key="standings_points"
+    )
+    total_rows = len(rankings) if points is None else point_totals[points]
+    start, end = page_bounds(total_rows, key=f"standings_page_{points}")
+    displayed_df = standings_page(params, points, start, end, rankings)
     
     # Display interactive dataframe
     selection = st.data_editor(
         displayed_df,
-        use_container_width=True,
+        width="stretch",
         disabled=["Rank", "Points", "W/L/D", "Tiebreaker"],
         hide_index=True,
         num_rows="fixed"
@@ -111,15 +141,73 @@ def display_player_stats(players, limit=128):
         selected_row = displayed_df.iloc[selected_index]
         player_id = selected_row["Player"].split()[1]  # Get ID from "Player X"
         st.session_state.clicked_player_id = str(player_id)
+
+@st.cache_resource
+def get_result_cache():
+    """One on-disk result cache shared by all sessions."""
+    return ResultCache()
+
+def start_simulation(number_of_players, draw_percentage, seed):
+    """Start a simulation in the background, unless the same one is already running."""
+    params = (int(number_of_players), int(draw_percentage), int(seed))
+    runner = st.session_state.runner
+    if runner is not None and runner.running:
+        if st.session_state.params == params:
+            return
+        runner.cancel()
+    
+    st.session_state.tournament = Tournament(params[0], params[1])
+    st.session_state.simulation = Simulation(st.session_state.tournament, seed=params[2])
+    st.session_state.runner = SimulationRunner(st.session_state.simulation, cache=get_result_cache())
+    st.session_state.params = params
+    st.session_state.results = None
+    st.session_state.rankings = None
+    st.session_state.results_shown = False
+    st.session_state.runner.start()
+
+@st.fragment(run_every=1.0)
+def display_progress():
+    """Poll the background simulation and show finished rounds as they come in."""
+    runner = st.session_state.runner
+    if runner is None:
+        return
+    
+    number_of_players, draw_percentage, seed = st.session_state.params
+    st.write(f"Tournament created with {number_of_players} players, {draw_percentage}% draw chance and seed {seed}")
+    st.write(f"Number of rounds: {st.session_state.tournament.number_of_rounds}")
+    
+    if runner.running:
+        st.progress(runner.progress, text=f"Round {len(runner.rounds)} of {st.session_state.tournament.number_of_rounds} done")
+        if st.button("Cancel"):
+            runner.cancel()
+        for snapshot in runner.rounds:
+            st.write(f"Round {snapshot.round_number} completed in {snapshot.seconds:.2f} seconds")
+        if runner.rounds:
+            st.write(f"### Standings after round {runner.rounds[-1].round_number}")
+            st.dataframe(pd.DataFrame(
+                [{"Player": f"Player {player_id}", "Points": points, "W/L/D": f"{wins}/{losses}/{draws}"}
+                 for player_id, points, wins, losses, draws in runner.rounds[-1].standings]
+            ), hide_index=True)
+        return
     
-    # Show/Hide buttons
-    if len(stats_data) > limit:
-        if not st.session_state.get('show_all_players', False):
-            if st.button("Show All Players"):
-                st.session_state.show_all_players = True
+    if runner.cancelled:
+        st.warning(f"Simulation cancelled after {len(runner.rounds)} rounds")
+    elif runner.error is not None:
+        st.error(f"Simulation failed: {runner.error}")
+    else:
+        if st.session_state.results is None:
+            # Built once and kept for every rerun that shows the results
+            st.session_state.results = ResultsStore.from_simulation(st.session_state.simulation)
+            st.session_state.rankings = st.session_state.tournament.rankings()
+        if runner.cache_hit:
+            st.write(f"Tournament loaded from cache in {runner.elapsed:.2f} seconds")
         else:
-            if st.button("Show Less"):
-                st.session_state.show_all_players = False
+            st.write(f"Tournament completed in {runner.elapsed:.2f} seconds")
+        st.write(f"Total number of matches played: {st.session_state.simulation.match_count}")
+        if not st.session_state.results_shown:
+            # Rerun the whole app once so the final results get drawn
+            st.session_state.results_shown = True
+            st.rerun()
 
 def main():
     # Set wide mode
@@ -130,13 +218,16 @@ def main():
     if 'tournament' not in st.session_state:
         st.session_state.tournament = None
         st.session_state.simulation = None
-        st.session_state.show_all_players = False
         st.session_state.show_history = False
         st.session_state.current_player_id = None
-        st.session_state.matches_per_round = {}
+        st.session_state.results = None
+        st.session_state.rankings = None
+        st.session_state.runner = None
+        st.session_state.params = None
+        st.session_state.results_shown = False
 
-    # Create two columns for the number inputs
-    input_col1, input_col2 = st.columns(2)
+    # Create three columns for the number inputs
+    input_col1, input_col2, input_col3 = st.columns(3)
 
     with input_col1:
         number_of_players = st.number_input(
@@ -155,27 +246,23 @@ def main():
             value=0
         )       
 
+    with input_col3:
+        seed = st.number_input(
+            "Seed",
+            step=1,
+            min_value=0,
+            value=0
+        )
+
     if st.button("Calculate"):
         if number_of_players > 0:
-            st.write("New tournament starting...")
-            start_time = time.time()
-            
-            st.session_state.tournament = Tournament(int(number_of_players), int(draw_percentage))
-            st.session_state.simulation = Simulation(st.session_state.tournament)
-            
-            st.write(f"Tournament created with {number_of_players} players and {draw_percentage}% draw chance")
-            st.write(f"Number of rounds: {st.session_state.tournament.number_of_rounds}")
-            
-            st.session_state.simulation.simulate()
-            
-            end_time = time.time()
-            total_time = end_time - start_time
-            st.write(f"Tournament completed in {total_time:.2f} seconds")
-            
-            st.write(f"Total number of matches played: {len(st.session_state.simulation.matches)}")
+            start_simulation(number_of_players, draw_percentage, seed)
+
+    display_progress()
 
-    # Show results if tournament exists
-    if st.session_state.tournament is not None:
+    # Show results once the simulation has finished
+    runner = st.session_state.runner
+    if runner is not None and runner.done and st.session_state.results is not None:
         st.write("## Tournament Results")
         
         # Create three columns with specific widths
@@ -183,13 +270,11 @@ def main():
         
         # Display player statistics in left column
         with left_col:
-            display_player_stats(st.session_state.tournament.players)
+            display_player_stats(st.session_state.rankings, st.session_state.results, st.session_state.params)
         
         # Display round results in middle column
         with middle_col:
-            # Display each round's results from session state
-            for round_num in sorted(st.session_state.matches_per_round.keys()):
-                display_round_results(st.session_state.matches_per_round[round_num], round_num)
+            display_round_results(st.session_state.results, st.session_state.params)
         
         # Display player search and match history in right column
         with right_col:
@@ -197,7 +282,7 @@ def main():
             player_id = st.number_input(
                 "Enter Player ID",
                 min_value=0,
-                max_value=number_of_players-1,
+                max_value=st.session_state.params[0]-1,
                 value=0,
                 step=1,
                 key="player_search"
@@ -207,11 +292,8 @@ def main():
                 st.session_state.show_history = True
                 st.session_state.current_player_id = player_id
                 
-                # Find the player with the entered ID
-                for player in st.session_state.tournament.players:
-                    if player and player.player_id == st.session_state.current_player_id:
-                        display_player_match_history(st, player)
-                        break
+                results = st.session_state.results
+                display_player_match_history(st, results.player(st.session_state.current_player_id), results)
             
             # Add a clear button to reset the history view
             if st.session_state.show_history:
@@ -219,7 +301,7 @@ def main():
                     st.session_state.show_history = False
                     st.session_state.current_player_id = None
 
-    else:
+    elif runner is None:
         st.error("Please enter a positive number of players")
 
 if __name__ == "__main__":
@@ -2,6 +2,8 @@ from player import Player
 from typing import Optional
 
 class Match:
+    __slots__ = ('player1', 'player2', 'result', 'round_number')
+
     def __init__(self, player1: Player, player2: Optional[Player], result: Optional[Player] = None, round_number: int = 0):
         self.player1 = player1
         self.player2 = player2
@@ -0,0 +1,256 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from match import Match
+import numpy as np
+import os
+import tempfile
+
+# One fixed-width record per match; player2 is -1 for a bye and result is -1 for a draw
+RECORD_DTYPE = np.dtype([
+    ('player1', '<i4'),
+    ('player2', '<i4'),
+    ('result', '<i4'),
+    ('round_number', '<i4'),
+])
+
+def matches_to_records(matches: Iterable[Match]) -> np.ndarray:
+    """The given matches as RECORD_DTYPE records, in the same order."""
+    return np.array([
+        (match.player1.player_id,
+         match.player2.player_id if match.player2 is not None else -1,
+         match.result.player_id if match.result is not None else -1,
+         match.round_number)
+        for match in matches
+    ], dtype=RECORD_DTYPE)
+
+def records_to_matches(records: np.ndarray, players: Sequence) -> List[Match]:
+    """Matches rebuilt from RECORD_DTYPE records, with players looked up by player_id."""
+    return [
+        Match(
+            players[player1],
+            players[player2] if player2 >= 0 else None,
+            players[result] if result >= 0 else None,
+            round_number,
+        )
+        for player1, player2, result, round_number in records.tolist()
+    ]
+
+class MatchHistory:
+    """
+    Keeps every Match of a simulation in memory.
+    Players keep their own match_history as well.
+    """
+    keeps_player_history = True
+    keeps_matches = True
+
+    def __init__(self, players: Sequence):
+        self.players = players
+        self.round_ranges: Dict[int, Tuple[int, int]] = {}  # round_number -> (start, end) index
+        self._round_start = 0
+        self._matches: List[Match] = []
+
+    def __len__(self) -> int:
+        return len(self._matches)
+
+    @property
+    def matches(self) -> Sequence[Match]:
+        """All matches in the order they were played."""
+        return self._matches
+
+    def record(self, match: Match) -> None:
+        """Store a played match."""
+        self._matches.append(match)
+
+    def record_records(self, records: np.ndarray) -> None:
+        """Store already played matches, given as RECORD_DTYPE records."""
+        self._matches.extend(records_to_matches(records, self.players))
+
+    def close(self) -> None:
+        """Called once no more matches will be recorded, to release what the backend holds open."""
+
+    def end_round(self, round_number: int) -> None:
+        """Mark the end of a round."""
+        self.round_ranges[round_number] = (self._round_start, len(self))
+        self._round_start = len(self)
+
+    def round_matches(self, round_number: int) -> List[Match]:
+        """Matches played in the given round."""
+        start, end = self.round_ranges.get(round_number, (0, 0))
+        return list(self.matches[start:end])
+
+    def player_matches(self, player) -> List[Match]:
+        """Matches played by the given player."""
+        return list(player.match_history)
+
+class StatsOnlyHistory(MatchHistory):
+    """
+    Keeps no matches at all, only the count.
+    Players still keep the aggregates needed for standings and tiebreakers.
+    """
+    keeps_player_history = False
+    keeps_matches = False
+
+    def __init__(self, players: Sequence):
+        super().__init__(players)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def matches(self) -> Sequence[Match]:
+        return []
+
+    def record(self, match: Match) -> None:
+        self._count += 1
+
+    def record_records(self, records: np.ndarray) -> None:
+        self._count += len(records)
+
+    def round_matches(self, round_number: int) -> List[Match]:
+        return []
+
+    def player_matches(self, player) -> List[Match]:
+        return []
+
+class DiskMatches:
+    """Read-only sequence of the matches in a DiskHistory file."""
+    def __init__(self, history: 'DiskHistory'):
+        self.history = history
+
+    def __len__(self) -> int:
+        return len(self.history)
+
+    def __getitem__(self, index):
+        records = self.history.records()
+        if isinstance(index, slice):
+            return records_to_matches(records[index], self.history.players)
+        return self.history.to_match(records[index])
+
+    def __iter__(self):
+        records = self.history.records()
+        for start in range(0, len(records), 4096):
+            yield from records_to_matches(records[start:start + 4096], self.history.players)
+
+class DiskHistory(MatchHistory):
+    """
+    Streams each round's matches to an append-only file of fixed-width records
+    and reads them back lazily through a memory map.
+
+    Without a path the file is a temporary one owned by the history: it is
+    deleted by delete(), when used as a context manager or when the history
+    is garbage collected. A given path is always kept.
+    """
+    keeps_player_history = False
+
+    def __init__(self, players: Sequence, path: Optional[str] = None):
+        super().__init__(players)
+        self._owns_path = path is None
+        if path is None:
+            handle, path = tempfile.mkstemp(suffix=".matches")
+            os.close(handle)
+        self.path = path
+        self._file = open(path, 'wb')
+        self._buffer: List[Match] = []  # Recorded matches not written yet
+        self._written = 0
+        self._records: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self._written + len(self._buffer)
+
+    @property
+    def matches(self) -> Sequence[Match]:
+        return DiskMatches(self)
+
+    def record(self, match: Match) -> None:
+        self._buffer.append(match)
+
+    def record_records(self, records: np.ndarray) -> None:
+        self.flush()
+        file = self._writer()
+        np.asarray(records, dtype=RECORD_DTYPE).tofile(file)
+        file.flush()
+        self._written += len(records)
+        self._records = None
+
+    def end_round(self, round_number: int) -> None:
+        """Write the round's matches to disk."""
+        self.flush()
+        super().end_round(round_number)
+
+    def flush(self) -> None:
+        """Write buffered matches to disk."""
+        if not self._buffer:
+            return
+        file = self._writer()
+        matches_to_records(self._buffer).tofile(file)
+        file.flush()
+        self._written += len(self._buffer)
+        self._buffer = []
+        self._records = None  # The memory map has to be reopened to see new records
+
+    def _writer(self):
+        """The file to append to, opened again if it was closed."""
+        if self._file.closed:
+            self._file = open(self.path, 'ab')
+        return self._file
+
+    def records(self) -> np.ndarray:
+        """All written records, memory-mapped."""
+        self.flush()
+        if self._records is None:
+            if self._written == 0:
+                return np.empty(0, dtype=RECORD_DTYPE)
+            self._records = np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', shape=(self._written,))
+        return self._records
+
+    def to_match(self, record) -> Match:
+        """Rebuild a Match from a record."""
+        return records_to_matches(np.asarray(record, dtype=RECORD_DTYPE).reshape(1), self.players)[0]
+
+    def round_matches(self, round_number: int) -> List[Match]:
+        start, end = self.round_ranges.get(round_number, (0, 0))
+        return records_to_matches(self.records()[start:end], self.players)
+
+    def player_matches(self, player) -> List[Match]:
+        records = self.records()
+        player_id = player.player_id
+        selected = records[(records['player1'] == player_id) | (records['player2'] == player_id)]
+        return records_to_matches(selected, self.players)
+
+    def close(self) -> None:
+        """Close the file; written matches stay readable and recording reopens it."""
+        self.flush()
+        self._file.close()
+
+    def delete(self) -> None:
+        """Close the file and delete it if it is a temporary file of this history."""
+        if not self._file.closed:
+            self._file.close()
+        self._buffer = []
+        self._records = None
+        if self._owns_path:
+            self._owns_path = False
+            try:
+                os.remove(self.path)
+            except OSError:  # Already gone, or still mapped on Windows
+                pass
+
+    def __enter__(self) -> 'DiskHistory':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.delete()
+
+    def __del__(self) -> None:
+        if getattr(self, "_file", None) is not None:
+            self.delete()
+
+def create_history(history_type: str, players: Sequence, path: Optional[str] = None) -> MatchHistory:
+    """Create the history backend of the given type: "memory", "stats" or "disk"."""
+    if history_type == "memory":
+        return MatchHistory(players)
+    if history_type == "stats":
+        return StatsOnlyHistory(players)
+    if history_type == "disk":
+        return DiskHistory(players, path)
+    raise ValueError(f"Unknown history type: {history_type}")
@@ -0,0 +1,122 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from result_cache import ResultCache
+from tournament import Tournament
+from tournament_simulation import Simulation
+import os
+
+DEFAULT_CUTS = (8, 16, 32)
+
+class CutStatistics:
+    """
+    Statistics merged over many simulated tournaments:
+    - cut_points: histogram of the points of the last player making each cut
+    - cut_tiebreakers: histogram of the tiebreaker of that player
+    - record_counts: how many players finished with each W-L-D record
+    - record_made_cut: how many of those made each cut
+    """
+    def __init__(self, cuts: Iterable[int] = DEFAULT_CUTS):
+        self.cuts = tuple(cuts)
+        self.runs = 0
+        self.cut_points: Dict[int, Counter] = {cut: Counter() for cut in self.cuts}
+        self.cut_tiebreakers: Dict[int, Counter] = {cut: Counter() for cut in self.cuts}
+        self.record_counts: Counter = Counter()
+        self.record_made_cut: Dict[int, Counter] = {cut: Counter() for cut in self.cuts}
+
+    def add_tournament(self, tournament: Tournament) -> None:
+        """Add the final standings of a simulated tournament."""
+        rankings = tournament.rankings()
+        self.runs += 1
+        for player in tournament.players:
+            self.record_counts[f"{player.wins}-{player.losses}-{player.draws}"] += 1
+        # Only the players making the largest cut need to be ranked
+        top = rankings.top(max(self.cuts, default=0))
+        for rank, player in enumerate(top, 1):
+            record = f"{player.wins}-{player.losses}-{player.draws}"
+            for cut in self.cuts:
+                if rank <= cut:
+                    self.record_made_cut[cut][record] += 1
+        for cut in self.cuts:
+            if cut <= len(top):
+                last_in = top[cut - 1]
+                self.cut_points[cut][last_in.get_points()] += 1
+                self.cut_tiebreakers[cut][last_in.calculate_tiebreaker()] += 1
+
+    def merge(self, other: 'CutStatistics') -> None:
+        """Merge the statistics of another batch into this one."""
+        self.runs += other.runs
+        self.record_counts.update(other.record_counts)
+        for cut in self.cuts:
+            self.cut_points[cut].update(other.cut_points[cut])
+            self.cut_tiebreakers[cut].update(other.cut_tiebreakers[cut])
+            self.record_made_cut[cut].update(other.record_made_cut[cut])
+
+    def cut_probability(self, cut: int) -> Dict[str, float]:
+        """Probability of making the given cut for each W-L-D record."""
+        return {record: self.record_made_cut[cut][record] / count
+                for record, count in self.record_counts.items()}
+
+    def cut_line_distribution(self, cut: int) -> Dict[int, float]:
+        """Probability that the given cut ends on each point total."""
+        return {points: count / self.runs
+                for points, count in sorted(self.cut_points[cut].items())}
+
+def run_seed(base_seed: int, run_index: int) -> str:
+    """Seed of a single run, independent of which worker runs it."""
+    return f"{base_seed}-{run_index}"
+
+def _simulate_runs(number_of_players: int, draw_percentage: int, pairing: str,
+                   cuts: Tuple[int, ...], base_seed: int, run_indices: List[int],
+                   cache: Optional[ResultCache] = None) -> CutStatistics:
+    """Simulate the given runs in a worker process and return only the merged statistics."""
+    stats = CutStatistics(cuts)
+    for run_index in run_indices:
+        tournament = Tournament(number_of_players, draw_percentage)
+        simulation = Simulation(tournament, pairing, history="stats", seed=run_seed(base_seed, run_index))
+        if cache is not None:
+            cache.run(simulation)
+        else:
+            simulation.simulate()
+        stats.add_tournament(tournament)
+    return stats
+
+def simulate_many(tournament: Tournament, runs: int, base_seed: int = 0,
+                  cuts: Iterable[int] = DEFAULT_CUTS, pairing: str = "bucket",
+                  max_workers: Optional[int] = None, cache: Optional[ResultCache] = None) -> CutStatistics:
+    """
+    Simulate the given tournament configuration many times on a process pool.
+    Only the number of players and the draw percentage of the tournament are used,
+    see simulate_field.
+    """
+    return simulate_field(tournament.number_of_players, tournament.draw_percentage, runs, base_seed,
+                          cuts, pairing, max_workers, cache)
+
+def simulate_field(number_of_players: int, draw_percentage: int, runs: int, base_seed: int = 0,
+                   cuts: Iterable[int] = DEFAULT_CUTS, pairing: str = "bucket",
+                   max_workers: Optional[int] = None, cache: Optional[ResultCache] = None) -> CutStatistics:
+    """
+    Simulate a field of number_of_players many times on a process pool.
+    Each run is seeded from the base seed and its index, so results don't depend
+    on the number of workers. With a cache, runs that were simulated before are loaded.
+    """
+    cuts = tuple(cuts)
+    max_workers = max_workers or os.cpu_count() or 1
+    # A few chunks per worker keeps the pool busy without much pickling overhead
+    chunk_count = min(runs, max_workers * 4)
+    chunks = [list(range(i, runs, chunk_count)) for i in range(chunk_count)]
+
+    stats = CutStatistics(cuts)
+    if max_workers == 1:
+        for chunk in chunks:
+            stats.merge(_simulate_runs(number_of_players, draw_percentage,
+                                       pairing, cuts, base_seed, chunk, cache))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_simulate_runs, number_of_players,
+                                   draw_percentage, pairing, cuts, base_seed, chunk, cache)
+                   for chunk in chunks]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
@@ -0,0 +1,306 @@
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+
+class BucketPairer:
+    """
+    Pairs players inside score-group buckets.
+
+    Players are grouped by points and each bucket is paired from the top
+    down. Whoever can't be paired inside their bucket floats down to the
+    next bucket, and the rematches that are left at the very end are fixed
+    by swapping partners with a bounded number of already made pairs.
+    Players are given as player_ids with their points indexed by player_id,
+    rematches are looked up in the RematchIndex.
+    """
+    def __init__(self, rematch_index, max_score_difference: int = 3, scan_limit: int = 64, repair_depth: int = 64):
+        self.rematch_index = rematch_index
+        self.max_score_difference = max_score_difference
+        self.scan_limit = scan_limit  # How far to look for a non-rematch inside a bucket
+        self.repair_depth = repair_depth  # How many made pairs to try swapping with per leftover
+
+    def pair(self, player_ids: List[int], points: Sequence[int]) -> Tuple[List[Tuple[int, int]], List[int]]:
+        """
+        Pair the given players.
+        Returns the list of pairs and the players that could not be paired.
+        """
+        buckets: Dict[int, List[int]] = {}
+        for player_id in player_ids:
+            buckets.setdefault(points[player_id], []).append(player_id)
+
+        pairs: List[Tuple[int, int]] = []
+        floaters: List[int] = []
+        for bucket_points in sorted(buckets.keys(), reverse=True):
+            # Floaters from the bucket above are paired first
+            group = buckets[bucket_points] + floaters
+            floaters = self._pair_group(group, points, pairs)
+
+        unpaired = self._repair(floaters, pairs)
+        return pairs, unpaired
+
+    def _pair_group(self, group: List[int], points: Sequence[int], pairs: List[Tuple[int, int]]) -> List[int]:
+        """
+        Pair players within one group, preferring opponents within the score window.
+        Returns the players that have to float down.
+        """
+        leftover = []
+        # Work from the end of the list so that removals are cheap
+        while group:
+            player_id = group.pop()
+            opponent_index = self._find_opponent_index(player_id, group, points)
+            if opponent_index is None:
+                leftover.append(player_id)
+            else:
+                pairs.append((player_id, group.pop(opponent_index)))
+        leftover.reverse()
+        return leftover
+
+    def _find_opponent_index(self, player_id: int, candidates: List[int], points: Sequence[int]):
+        """Find the closest candidate (from the end) that this player hasn't played yet."""
+        has_played = self.rematch_index.has_played
+        player_points = points[player_id]
+        fallback = None
+        lowest = max(len(candidates) - self.scan_limit, 0)
+        for index in range(len(candidates) - 1, lowest - 1, -1):
+            candidate = candidates[index]
+            if has_played(player_id, candidate):
+                continue
+            if abs(points[candidate] - player_points) <= self.max_score_difference:
+                return index
+            if fallback is None:
+                fallback = index
+        return fallback
+
+    def _repair(self, leftover: List[int], pairs: List[Tuple[int, int]]) -> List[int]:
+        """
+        Try to pair the leftover players by breaking up recently made pairs.
+        For leftovers p and q and a pair (a, b), pairs become (p, a) and (q, b)
+        when neither of those are rematches.
+        """
+        unpaired = []
+        while len(leftover) >= 2:
+            player_id = leftover.pop()
+            if self._repair_player(player_id, leftover, pairs):
+                continue
+            unpaired.append(player_id)
+        unpaired.extend(leftover)
+        return unpaired
+
+    def _repair_player(self, player_id: int, leftover: List[int], pairs: List[Tuple[int, int]]) -> bool:
+        """Pair the player with another leftover, directly or through a swap. Returns True on success."""
+        has_played = self.rematch_index.has_played
+        for index, other in enumerate(leftover):
+            if not has_played(player_id, other):
+                leftover.pop(index)
+                pairs.append((player_id, other))
+                return True
+
+        lowest = max(len(pairs) - self.repair_depth, 0)
+        for pair_index in range(len(pairs) - 1, lowest - 1, -1):
+            a, b = pairs[pair_index]
+            for index, other in enumerate(leftover):
+                if not has_played(player_id, a) and not has_played(other, b):
+                    pairs[pair_index] = (player_id, a)
+                elif not has_played(player_id, b) and not has_played(other, a):
+                    pairs[pair_index] = (player_id, b)
+                    a, b = b, a
+                else:
+                    continue
+                leftover.pop(index)
+                pairs.append((other, b))
+                return True
+        return False
+
+class CompletePairing:
+    """
+    Completes a pairing so that everyone who can be paired is.
+
+    The players of the round form a compatibility graph, with an edge between
+    every two players who haven't played each other. Starting from the pairs
+    already made, every unpaired player searches for an augmenting path with
+    Edmonds' blossom algorithm: a path that reshuffles already made pairs so
+    that one more pair fits. When no such path exists for any unpaired player
+    the matching is maximum.
+
+    The search runs in two passes. The first only uses edges within
+    max_score_difference: neighbours are slices of the players sorted by
+    points, so visiting a player costs the size of its score window rather
+    than the whole field. Players it can't pair are searched again over all
+    edges. Within a pass opponents are tried closest score first, so the
+    reshuffled pairs stay as close in score as the paths allow.
+
+    The work of the searches is capped at max_steps per call, counted as players
+    taken off the search queue plus the neighbours they scan and the players
+    checked when contracting a blossom. Once the cap is used up the rest of the
+    players stay unpaired. The cap doesn't depend on how fast the machine is,
+    so the same seed always gives the same pairings.
+    """
+    def __init__(self, rematch_index, max_score_difference: int = 3, max_steps: int = 20_000_000):
+        self.rematch_index = rematch_index
+        self.max_score_difference = max_score_difference
+        self.max_steps = max_steps
+
+    def complete(self, player_ids: List[int], points: Sequence[int], pairs: List[Tuple[int, int]],
+                 unpaired: List[int]) -> Tuple[List[Tuple[int, int]], List[int], bool]:
+        """
+        Extend the pairs of the given players with the unpaired ones.
+        Players are player_ids with their points indexed by player_id.
+        Returns the pairs, the players still unpaired and whether the search
+        finished within max_steps (if not, some of them might have been pairable).
+        Pairs that weren't changed keep their order.
+        """
+        if len(unpaired) < 2:
+            return pairs, unpaired, True
+        self._steps_left = self.max_steps
+        position = {player_id: i for i, player_id in enumerate(player_ids)}
+        self._ids = np.array(player_ids, dtype=np.int32)
+        self._points = np.array([points[player_id] for player_id in player_ids], dtype=np.int32)
+        # Score windows as ranges of the players sorted by points, computed once per call
+        self._by_points = np.argsort(self._points, kind='stable')
+        sorted_points = self._points[self._by_points]
+        self._window_start = np.searchsorted(sorted_points, self._points - self.max_score_difference, 'left')
+        self._window_end = np.searchsorted(sorted_points, self._points + self.max_score_difference, 'right')
+        match = [-1] * len(player_ids)
+        for player1, player2 in pairs:
+            i, j = position[player1], position[player2]
+            match[i], match[j] = j, i
+
+        finished = True
+        roots = [position[player_id] for player_id in unpaired]
+        for within_window in (True, False):
+            self._within_window = within_window
+            self._neighbors: Dict[int, List[int]] = {}
+            self._neighbor_sets: Dict[int, Set[int]] = {}
+            for root in roots:
+                if match[root] != -1:
+                    continue  # Paired by an earlier augmenting path
+                if self._steps_left <= 0:
+                    finished = False
+                    break
+                self._free = {i for i in roots if match[i] == -1 and i != root}
+                end = self._find_augmenting_path(root, match)
+                if end is None:
+                    finished = False
+                    break
+                while end != -1:  # Flip the path: every other edge becomes a pair
+                    parent = self._parent[end]
+                    next_end = match[parent]
+                    match[end], match[parent] = parent, end
+                    end = next_end
+            if not finished:
+                break
+        self._neighbors = {}
+        self._neighbor_sets = {}
+
+        completed = [(player1, player2) for player1, player2 in pairs
+                     if match[position[player1]] == position[player2]]
+        if len(completed) < len(pairs) or any(match[root] != -1 for root in roots):
+            kept = {player_id for pair in completed for player_id in pair}
+            for i, player_id in enumerate(player_ids):
+                if match[i] > i and player_id not in kept:
+                    completed.append((player_id, player_ids[match[i]]))
+        still_unpaired = [player_id for player_id in unpaired if match[position[player_id]] == -1]
+        return completed, still_unpaired, finished
+
+    def _neighbors_of(self, v: int) -> List[int]:
+        """Players v hasn't played, in its score window during the first pass, closest in score first."""
+        neighbors = self._neighbors.get(v)
+        if neighbors is None:
+            if self._within_window:
+                candidates = self._by_points[self._window_start[v]:self._window_end[v]]
+            else:
+                candidates = np.arange(len(self._ids))
+            candidates = candidates[candidates != v]
+            candidates = candidates[self.rematch_index.unplayed_mask(int(self._ids[v]), self._ids[candidates])]
+            difference = np.abs(self._points[candidates] - self._points[v])
+            neighbors = candidates[np.argsort(difference, kind='stable')].tolist()
+            self._neighbors[v] = neighbors
+        return neighbors
+
+    def _closest_free_neighbor(self, v: int) -> Optional[int]:
+        """The unpaired player (other than the search root) closest in score that v may play, if any."""
+        free = self._free
+        if not free:
+            return None
+        neighbor_set = self._neighbor_sets.get(v)
+        if neighbor_set is None:
+            neighbor_set = self._neighbor_sets[v] = set(self._neighbors_of(v))
+        candidates = [f for f in free if f in neighbor_set]
+        if not candidates:
+            return None
+        points = self._points
+        return min(candidates, key=lambda f: (abs(int(points[f]) - int(points[v])), f))
+
+    def _find_augmenting_path(self, root: int, match: List[int]) -> Optional[int]:
+        """
+        Search an augmenting path from the unpaired root with a breadth-first
+        search that contracts odd cycles (blossoms) into their base.
+        Returns the free player the path ends at, -1 if there is none, or None
+        if max_steps ran out. The path is read back through self._parent.
+        """
+        parent: Dict[int, int] = {}
+        base: Dict[int, int] = {}
+        in_tree = {root}  # Even players of the search tree, including contracted blossoms
+        queue = deque([root])
+        self._parent = parent
+
+        def base_of(v: int) -> int:
+            return base.get(v, v)
+
+        def common_base(a: int, b: int) -> int:
+            seen = set()
+            while True:
+                a = base_of(a)
+                seen.add(a)
+                if match[a] == -1:
+                    break
+                a = parent[match[a]]
+            while True:
+                b = base_of(b)
+                if b in seen:
+                    return b
+                b = parent[match[b]]
+
+        def mark_path(v: int, blossom_base: int, child: int, blossom: Set[int]) -> None:
+            while base_of(v) != blossom_base:
+                blossom.add(base_of(v))
+                blossom.add(base_of(match[v]))
+                parent[v] = child
+                child = match[v]
+                v = parent[match[v]]
+
+        while queue:
+            if self._steps_left <= 0:
+                return None
+            v = queue.popleft()
+            neighbors = self._neighbors_of(v)
+            self._steps_left -= 1 + len(neighbors)
+            # Free players are few, so look for one among v's neighbours before walking them all
+            free_neighbor = self._closest_free_neighbor(v)
+            if free_neighbor is not None:
+                parent[free_neighbor] = v
+                return free_neighbor
+            for to in neighbors:
+                if base.get(v, v) == base.get(to, to) or match[v] == to:
+                    continue
+                if to == root or (match[to] != -1 and match[to] in parent):
+                    # An odd cycle: contract it into its base
+                    blossom_base = common_base(v, to)
+                    blossom: Set[int] = set()
+                    mark_path(v, blossom_base, to, blossom)
+                    mark_path(to, blossom_base, v, blossom)
+                    tree = list(in_tree) + list(parent)
+                    self._steps_left -= len(tree)
+                    for u in tree:
+                        if base_of(u) in blossom:
+                            base[u] = blossom_base
+                            if u not in in_tree:
+                                in_tree.add(u)
+                                queue.append(u)
+                elif to not in parent:
+                    parent[to] = v
+                    if match[to] == -1:
+                        return to
+                    in_tree.add(match[to])
+                    queue.append(match[to])
+        return -1
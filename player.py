@@ -1,24 +1,16 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+def _tenths(percentage: float) -> int:
+    """A percentage in tenths (75.3 -> 753), rounded the same way as ranking.ranking_columns."""
+    return int(round(percentage * 10))
+
+class BasePlayer:
+    """
+    Points, win percentage and tiebreaker calculations shared by Player and the
+    array-backed PlayerView. Subclasses provide the record attributes.
+    """
+    __slots__ = ()
 
-class Player:
-    def __init__(self, player_id: int):
-        self.player_id = player_id
-        self.wins = 0
-        self.losses = 0
-        self.draws = 0
-        self.match_history = []  # Will store the history of matches played
-        self.has_had_bye = False
-        self.opponents_faced = set()  # Track player_ids of opponents already faced
-        
-    def has_played_against(self, other_player) -> bool:
-        """Check if this player has already played against the given player."""
-        return other_player.player_id in self.opponents_faced
-    
-    def add_opponent(self, other_player) -> None:
-        """Record that this player has played against the given player."""
-        if other_player is not None:  # Don't record None (bye) as an opponent
-            self.opponents_faced.add(other_player.player_id)
-            
     def get_points(self) -> int:
         """
         Calculate total points:
@@ -37,27 +29,38 @@ class Player:
     
     def get_opponents(self) -> List['Player']:
         """Get list of all opponents (excluding byes)."""
-        return [match.player2 if match.player1 == self else match.player1 
-                for match in self.match_history 
-                if match.player2 is not None]  # Exclude byes
+        return list(self.opponents)
+
+    def get_average_opponent_winrate(self) -> float:
+        """Average win percentage of this player's opponents, from the running aggregates."""
+        if not self.opponents:
+            return 0.0
+        return self.opp_winrate_sum / len(self.opponents)
+
+    def refresh_opponent_winrate(self) -> None:
+        """Recompute the sum of opponent win percentages."""
+        self.opp_winrate_sum = sum(opp.get_win_percentage() for opp in self.opponents)
+
+    def refresh_opponent_opponent_winrate(self) -> None:
+        """
+        Recompute the sum of the opponents' average opponent win percentages.
+        Relies on the opponents' own opp_winrate_sum being up to date.
+        """
+        self.opp_opp_winrate_sum = 0.0
+        self.opp_opp_count = 0
+        for opp in self.opponents:
+            if opp.opponents:
+                self.opp_opp_winrate_sum += opp.get_average_opponent_winrate()
+                self.opp_opp_count += 1
+        self._tiebreaker = None
     
     def calculate_loss_rounds_score(self) -> int:
         """
         Calculate the sum of squares of rounds where the player lost.
         Returns a 3-digit maximum number.
         """
-        loss_rounds_sum = 0
-        for match in self.match_history:
-            # Skip byes
-            if match.player2 is None:
-                continue
-            
-            # Check if this player lost the match
-            if match.result is not None and match.result != self:
-                loss_rounds_sum += match.round_number * match.round_number
-        
-        # Ensure it's maximum 3 digits
-        return min(loss_rounds_sum, 999)
+        # The sum itself is kept up to date by record_match
+        return min(self.loss_rounds_sum, 999)
     
     def calculate_tiebreaker(self) -> str:
         """
@@ -67,31 +70,145 @@ class Player:
         ZZZ = average opponent's opponents win percentage (3 digits)
         AAA = sum of squares of loss rounds (3 digits)
         TODO: should bye be considered as best or worst tiebreaker?
+
+        The result is cached until the next Tournament.refresh_tiebreakers. When
+        this player's record changed since the last refresh the tiebreaker is
+        computed from scratch instead.
         """
+        if self._tiebreaker is not None:
+            return self._tiebreaker
+        
         # Get points (X)
         points = self.get_points()
+        averages = self._tiebreaker_averages()
+        if averages is None:
+            tiebreaker = f"{points}00000000"  # If no opponents, return just points with zeros
+        else:
+            tiebreaker = self._format_tiebreaker(points, *averages)
+        if not self.stats_changed:
+            self._tiebreaker = tiebreaker
+        return tiebreaker
+
+    def tiebreaker_key(self) -> Tuple[int, int, int, int]:
+        """
+        The tiebreaker as fixed numeric fields: (points, average opponent win
+        percentage in tenths, average opponent's opponents win percentage in
+        tenths, loss rounds score). Unlike the string these compare field by
+        field. See ranking.Rankings for ranking the whole field at once.
+
+        Always computed from the current records of the opponents, so the
+        result doesn't depend on when Tournament.refresh_tiebreakers last ran.
+        """
+        points = self.get_points()
+        averages = self._tiebreaker_averages(exact=True)
+        if averages is None:
+            return (points, 0, 0, 0)
+        avg_opp_winrate, avg_opp_opp_winrate = averages
+        return (points, _tenths(avg_opp_winrate), _tenths(avg_opp_opp_winrate),
+                self.calculate_loss_rounds_score())
+
+    def _tiebreaker_averages(self, exact: bool = False) -> Optional[Tuple[float, float]]:
+        """
+        Average opponent and opponent's opponents win percentage, or None without
+        opponents. Taken from the aggregates, unless this player's record changed
+        since the last refresh or exact is set: then opponents and their
+        opponents are walked. The aggregates also go stale when only an
+        opponent's record changed, until the next refresh.
+        """
+        opponents = self.opponents
+        if not opponents:
+            return None
+        if not self.stats_changed and not exact:
+            avg_opp_opp_winrate = (self.opp_opp_winrate_sum / self.opp_opp_count) if self.opp_opp_count else 0
+            return self.get_average_opponent_winrate(), avg_opp_opp_winrate
         
         # Calculate average opponent win percentage (YY)
-        opponents = self.get_opponents()
-        if not opponents:
-            return f"{points}00000000"  # If no opponents, return just points with zeros
-            
         avg_opp_winrate = sum(opp.get_win_percentage() for opp in opponents) / len(opponents)
         
         # Calculate average opponent's opponents win percentage (ZZZ)
         opp_opp_winrates = []
         for opp in opponents:
-            opp_opponents = opp.get_opponents()
+            opp_opponents = opp.opponents
             if opp_opponents:
                 avg_opp_opp_winrate = sum(opp_opp.get_win_percentage() 
                                         for opp_opp in opp_opponents) / len(opp_opponents)
                 opp_opp_winrates.append(avg_opp_opp_winrate)
         
         avg_opp_opp_winrate = (sum(opp_opp_winrates) / len(opp_opp_winrates)) if opp_opp_winrates else 0
-        
+        return avg_opp_winrate, avg_opp_opp_winrate
+
+    def _format_tiebreaker(self, points: int, avg_opp_winrate: float, avg_opp_opp_winrate: float) -> str:
+        """Format the tiebreaker string."""
         # Calculate loss rounds score (AAA)
         loss_rounds_score = self.calculate_loss_rounds_score()
         
-        # Format the tiebreaker string
         # For 75.3% -> 753, for 67.9% -> 679
-        return f"{points}{avg_opp_winrate:.1f}{avg_opp_opp_winrate:.1f}{loss_rounds_score:03d}".replace(".", "") 
\ No newline at end of file
+        return f"{points}{avg_opp_winrate:.1f}{avg_opp_opp_winrate:.1f}{loss_rounds_score:03d}".replace(".", "")
+
+class Player(BasePlayer):
+    def __init__(self, player_id: int, rematch_index=None):
+        self.player_id = player_id
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.match_history = []  # Will store the history of matches played
+        self.has_had_bye = False
+        # Opponents already faced are tracked by the tournament-wide RematchIndex when
+        # there is one, and in a set of player_ids otherwise
+        self.rematch_index = rematch_index
+        self._opponents_faced = set() if rematch_index is None else None
+        self.opponents = []  # Opponents in the order they were played
+        self.loss_rounds_sum = 0
+        # Running tiebreaker aggregates, refreshed by Tournament.refresh_tiebreakers
+        self.opp_winrate_sum = 0.0
+        self.opp_opp_winrate_sum = 0.0
+        self.opp_opp_count = 0
+        self.stats_changed = False  # Set when a match changed this player's record
+        self._tiebreaker = None  # Cached tiebreaker string
+        
+    @property
+    def opponents_faced(self) -> set:
+        """player_ids of opponents already faced."""
+        if self.rematch_index is not None:
+            return set(self.rematch_index.opponents_of(self.player_id).tolist())
+        return self._opponents_faced
+
+    def has_played_against(self, other_player) -> bool:
+        """Check if this player has already played against the given player."""
+        if self.rematch_index is not None:
+            return self.rematch_index.has_played(self.player_id, other_player.player_id)
+        return other_player.player_id in self._opponents_faced
+    
+    def add_opponent(self, other_player) -> None:
+        """Record that this player has played against the given player."""
+        if other_player is not None:  # Don't record None (bye) as an opponent
+            if self.rematch_index is not None:
+                self.rematch_index.add(self.player_id, other_player.player_id)
+            else:
+                self._opponents_faced.add(other_player.player_id)
+            self.opponents.append(other_player)
+
+    def record_match(self, match, keep_history: bool = True) -> None:
+        """
+        Record a match (or bye) played by this player.
+        Updates the record, the opponents and the loss rounds sum, and marks
+        the tiebreaker as stale. The match itself is only added to match_history
+        when keep_history is set.
+        """
+        if keep_history:
+            self.match_history.append(match)
+        if match.player2 is None:
+            self.wins += 1
+            self.has_had_bye = True
+        else:
+            if match.result is None:
+                self.draws += 1
+            elif match.result == self:
+                self.wins += 1
+            else:
+                self.losses += 1
+                self.loss_rounds_sum += match.round_number * match.round_number
+            self.add_opponent(match.player2 if match.player1 == self else match.player1)
+        self.stats_changed = True
+        self._tiebreaker = None
+
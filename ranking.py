@@ -0,0 +1,128 @@
+from typing import List, Optional, Sequence
+import numpy as np
+
+# Bit layout of the packed ranking key, most significant field first.
+# Win percentages in tenths go up to 1000 and the loss rounds score up to 999.
+LOSS_SCORE_BITS = 10
+OPP_OPP_WINRATE_BITS = 11
+OPP_WINRATE_BITS = 11
+
+def ranking_columns(players: Sequence, player_store=None) -> np.ndarray:
+    """
+    The numeric tiebreaker (see BasePlayer.tiebreaker_key) of every player as
+    an (n, 4) int64 array, computed from the running aggregates in bulk.
+    Pass the PlayerStore of array-backed players to read its columns directly.
+    The aggregates have to be up to date, see Tournament.refresh_tiebreakers.
+    """
+    count = len(players)
+    if player_store is not None:
+        wins = np.frombuffer(player_store.wins, dtype=np.int16)
+        draws = np.frombuffer(player_store.draws, dtype=np.int16)
+        loss_rounds_sum = np.frombuffer(player_store.loss_rounds_sum, dtype=np.int32)
+        opp_winrate_sum = np.frombuffer(player_store.opp_winrate_sum, dtype=np.float64)
+        opp_opp_winrate_sum = np.frombuffer(player_store.opp_opp_winrate_sum, dtype=np.float64)
+        opp_opp_count = np.frombuffer(player_store.opp_opp_count, dtype=np.int16)
+        opponent_count = sum((np.frombuffer(round_opponents, dtype=np.int32) >= 0).astype(np.int32)
+                             for round_opponents in player_store.round_opponents)
+        opponent_count = np.broadcast_to(opponent_count, (count,))
+    else:
+        wins = np.fromiter((p.wins for p in players), dtype=np.int64, count=count)
+        draws = np.fromiter((p.draws for p in players), dtype=np.int64, count=count)
+        loss_rounds_sum = np.fromiter((p.loss_rounds_sum for p in players), dtype=np.int64, count=count)
+        opp_winrate_sum = np.fromiter((p.opp_winrate_sum for p in players), dtype=np.float64, count=count)
+        opp_opp_winrate_sum = np.fromiter((p.opp_opp_winrate_sum for p in players), dtype=np.float64, count=count)
+        opp_opp_count = np.fromiter((p.opp_opp_count for p in players), dtype=np.int64, count=count)
+        opponent_count = np.fromiter((len(p.opponents) for p in players), dtype=np.int64, count=count)
+
+    has_opponents = opponent_count > 0
+    columns = np.zeros((count, 4), dtype=np.int64)
+    columns[:, 0] = wins.astype(np.int64) * 3 + draws
+    with np.errstate(divide='ignore', invalid='ignore'):
+        opp_winrate = np.where(has_opponents, opp_winrate_sum / opponent_count, 0.0)
+        opp_opp_winrate = np.where(opp_opp_count > 0, opp_opp_winrate_sum / opp_opp_count, 0.0)
+    columns[:, 1] = np.where(has_opponents, np.round(opp_winrate * 10), 0)
+    columns[:, 2] = np.where(has_opponents, np.round(opp_opp_winrate * 10), 0)
+    columns[:, 3] = np.where(has_opponents, np.minimum(loss_rounds_sum, 999), 0)
+    return columns
+
+def pack_keys(points: np.ndarray, opp_winrate: np.ndarray, opp_opp_winrate: np.ndarray,
+              loss_rounds_score: np.ndarray) -> np.ndarray:
+    """Pack the ranking columns into one int64 key each; a higher key ranks higher."""
+    return (points.astype(np.int64) << (OPP_WINRATE_BITS + OPP_OPP_WINRATE_BITS + LOSS_SCORE_BITS)
+            | opp_winrate.astype(np.int64) << (OPP_OPP_WINRATE_BITS + LOSS_SCORE_BITS)
+            | opp_opp_winrate.astype(np.int64) << LOSS_SCORE_BITS
+            | loss_rounds_score.astype(np.int64))
+
+class Rankings:
+    """
+    Standings of a tournament as array columns: points, both win percentage
+    tiebreakers in tenths and the loss rounds score, one entry per player.
+
+    Players rank by those columns in that order, highest first; players with
+    identical columns keep their order in the players list. The columns are
+    also packed into one int64 key per player, so top-K, rank and cut-line
+    queries don't need a full sort.
+
+    Usually built by Tournament.rankings; columns default to ranking_columns(players).
+    """
+    def __init__(self, players: Sequence, columns: Optional[np.ndarray] = None):
+        self.players = players
+        if columns is None:
+            columns = ranking_columns(players)
+        columns = np.asarray(columns, dtype=np.int64)
+        self.points = columns[:, 0]
+        self.opp_winrate = columns[:, 1]
+        self.opp_opp_winrate = columns[:, 2]
+        self.loss_rounds_score = columns[:, 3]
+        self.keys = pack_keys(self.points, self.opp_winrate, self.opp_opp_winrate, self.loss_rounds_score)
+        self._order = None
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def order(self) -> np.ndarray:
+        """Indices into players, best first."""
+        if self._order is None:
+            # lexsort is stable and sorts by the last column first
+            self._order = np.lexsort((-self.loss_rounds_score, -self.opp_opp_winrate,
+                                      -self.opp_winrate, -self.points))
+        return self._order
+
+    def ranked_players(self) -> List:
+        """All players, best first."""
+        return [self.players[i] for i in self.order().tolist()]
+
+    def top_indices(self, k: int) -> np.ndarray:
+        """Indices of the k best players, best first, without sorting the rest."""
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if self._order is not None or k >= len(self):
+            return self.order()[:k]
+        keys = self.keys
+        # Everyone above the k-th best key, then the first players (by index) on it,
+        # so ties at the cut resolve in list order like in order()
+        kth = -np.partition(-keys, k - 1)[k - 1]
+        above = np.flatnonzero(keys > kth)
+        candidates = np.concatenate([above, np.flatnonzero(keys == kth)[:k - len(above)]])
+        return candidates[np.lexsort((candidates, -keys[candidates]))]
+
+    def top(self, k: int) -> List:
+        """The k best players, best first."""
+        return [self.players[i] for i in self.top_indices(k).tolist()]
+
+    def rank_of(self, index: int) -> int:
+        """1-based rank of the player at the given index of players."""
+        key = self.keys[index]
+        return int(np.count_nonzero(self.keys > key) + np.count_nonzero(self.keys[:index] == key)) + 1
+
+    def points_at_rank(self, rank: int) -> int:
+        """Points of the player finishing at the given 1-based rank, e.g. the points needed for a top 8 cut."""
+        if not 1 <= rank <= len(self):
+            raise ValueError(f"Rank {rank} out of range for {len(self)} players")
+        return int(-np.partition(-self.points, rank - 1)[rank - 1])
+
+    def player_at_rank(self, rank: int):
+        """The player finishing at the given 1-based rank."""
+        if not 1 <= rank <= len(self):
+            raise ValueError(f"Rank {rank} out of range for {len(self)} players")
+        return self.players[int(self.top_indices(rank)[-1])]
@@ -0,0 +1,116 @@
+from array import array
+from typing import List, Optional, Set
+import numpy as np
+
+class RematchIndex:
+    """
+    Tournament-wide record of who has played whom, indexed by player_id.
+
+    Opponents are stored column by column: column k holds the k-th opponent of
+    every player (-1 when the player hasn't had that many opponents yet), so the
+    index grows by one packed column per round. Single lookups read the columns
+    directly, batch queries view them as NumPy arrays and answer for many
+    candidates at once.
+
+    With opponent_sets, a set of opponent ids is also kept per player so that
+    has_played is a single set lookup instead of a walk over the columns. The
+    sets take several times the memory of the columns, so compact storage
+    turns them off.
+    """
+    def __init__(self, number_of_players: int, opponent_sets: bool = True):
+        self.number_of_players = number_of_players
+        self.counts = array('h', bytes(2 * number_of_players))  # Opponents per player
+        self.columns: List[array] = []
+        self.opponent_sets: Optional[List[Set[int]]] = \
+            [set() for _ in range(number_of_players)] if opponent_sets else None
+
+    def add(self, player_id: int, opponent_id: int) -> None:
+        """Record that player_id has played opponent_id (one direction only)."""
+        count = self.counts[player_id]
+        if count == len(self.columns):
+            self.columns.append(array('i', [-1]) * self.number_of_players)
+        self.columns[count][player_id] = opponent_id
+        self.counts[player_id] = count + 1
+        if self.opponent_sets is not None:
+            self.opponent_sets[player_id].add(opponent_id)
+
+    def add_many(self, player_ids: np.ndarray, opponent_ids: np.ndarray) -> None:
+        """
+        Record that each player_ids[i] has played opponent_ids[i] (one direction
+        only), for players that appear at most once, such as the players of a round.
+        """
+        counts = np.frombuffer(self.counts, dtype=np.int16)
+        player_counts = counts[player_ids]
+        # Players with the same number of opponents so far go into the same column
+        for count in np.unique(player_counts).tolist():
+            if count == len(self.columns):
+                self.columns.append(array('i', [-1]) * self.number_of_players)
+            selected = player_counts == count
+            np.frombuffer(self.columns[count], dtype=np.int32)[player_ids[selected]] = opponent_ids[selected]
+        counts[player_ids] += 1
+        if self.opponent_sets is not None:
+            for player_id, opponent_id in zip(player_ids.tolist(), opponent_ids.tolist()):
+                self.opponent_sets[player_id].add(opponent_id)
+
+    def load(self, opponents: np.ndarray) -> None:
+        """
+        Replace the index with the given opponents: a (players x rounds) array of
+        opponent ids in the order they were played, -1 where there was none.
+        """
+        played = opponents >= 0
+        counts = played.sum(axis=1)
+        position = np.cumsum(played, axis=1) - 1
+        packed = np.full((self.number_of_players, int(counts.max(initial=0))), -1, dtype=np.int32)
+        packed[np.nonzero(played)[0], position[played]] = opponents[played]
+        self.counts = array('h', counts.astype(np.int16).tobytes())
+        self.columns = [array('i', np.ascontiguousarray(packed[:, k]).tobytes()) for k in range(packed.shape[1])]
+        if self.opponent_sets is not None:
+            self.opponent_sets = [set(row[:count]) for row, count in zip(packed.tolist(), counts.tolist())]
+
+    def has_played(self, player_id: int, opponent_id: int) -> bool:
+        """Check if player_id has already played opponent_id."""
+        if self.opponent_sets is not None:
+            return opponent_id in self.opponent_sets[player_id]
+        columns = self.columns
+        for k in range(self.counts[player_id]):
+            if columns[k][player_id] == opponent_id:
+                return True
+        return False
+
+    def opponents_of(self, player_id: int) -> np.ndarray:
+        """Opponent ids of a player, in the order they were added."""
+        columns = self.columns
+        return np.array([columns[k][player_id] for k in range(self.counts[player_id])], dtype=np.int32)
+
+    def _column_arrays(self) -> List[np.ndarray]:
+        """The columns as NumPy arrays, sharing memory with the index."""
+        return [np.frombuffer(column, dtype=np.int32) for column in self.columns]
+
+    def unplayed_mask(self, player_id: int, candidate_ids: np.ndarray) -> np.ndarray:
+        """Boolean mask of the candidates that player_id hasn't played yet."""
+        return ~np.isin(candidate_ids, self.opponents_of(player_id))
+
+    def unplayed_pairs(self, player_ids: np.ndarray, opponent_ids: np.ndarray) -> np.ndarray:
+        """Boolean mask of the (player_ids[i], opponent_ids[i]) pairs that haven't been played yet."""
+        unplayed = np.ones(len(player_ids), dtype=bool)
+        for column in self._column_arrays():
+            unplayed &= column[player_ids] != opponent_ids
+        return unplayed
+
+    def count_played_within(self, player_ids: np.ndarray, member_mask: np.ndarray) -> np.ndarray:
+        """
+        For each of the given players, count how many of their opponents are
+        members of the group given as a boolean mask over all player_ids.
+        """
+        counts = np.zeros(len(player_ids), dtype=np.int32)
+        for column in self._column_arrays():
+            opponents = column[player_ids]
+            played = opponents >= 0
+            counts[played] += member_mask[opponents[played]]
+        return counts
+
+    def member_mask(self, player_ids: np.ndarray) -> np.ndarray:
+        """Boolean mask over all player_ids, set for the given players."""
+        mask = np.zeros(self.number_of_players, dtype=bool)
+        mask[player_ids] = True
+        return mask
@@ -0,0 +1,164 @@
+from typing import Optional
+from match_history import matches_to_records
+from tournament_simulation import ENGINE_VERSION, Simulation
+import hashlib
+import json
+import numpy as np
+import os
+import tempfile
+
+class ResultCache:
+    """
+    On-disk cache of finished simulations, keyed by everything that decides the
+    results: player count, draw percentage, number of rounds, seed, pairing method
+    and ENGINE_VERSION. Entries written before the number of rounds was part of
+    the key are never matched again and age out through eviction.
+
+    Each entry is one .npz file with the final standings (record, bye and
+    tiebreakers per player) and, when the simulation kept them, all matches per
+    round. Entries are evicted least recently used once the directory grows
+    past max_bytes.
+    """
+    def __init__(self, directory: str = ".tournament_cache", max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, simulation: Simulation) -> Optional[str]:
+        """Cache key of a simulation, or None when it isn't seeded and can't be reused."""
+        if simulation.seed is None:
+            return None
+        params = {
+            "players": simulation.tournament.number_of_players,
+            "draw_percentage": simulation.tournament.draw_percentage,
+            "rounds": simulation.tournament.number_of_rounds,
+            "seed": simulation.seed,
+            "pairing": simulation.pairing,
+            "engine_version": ENGINE_VERSION,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def run(self, simulation: Simulation) -> bool:
+        """Load the simulation from the cache, or simulate and store it. Returns True on a cache hit."""
+        if self.load_into(simulation):
+            return True
+        simulation.simulate()
+        self.save(simulation)
+        return False
+
+    def load_into(self, simulation: Simulation) -> bool:
+        """
+        Restore a cached result into a simulation that hasn't run yet.
+        Entries without matches are only used when the simulation doesn't keep matches either.
+        """
+        key = self.key(simulation)
+        if key is None or not os.path.exists(self._path(key)):
+            return False
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return False  # Partly written or corrupt, treat as a miss
+        if len(entry["matches"]) == 0 and simulation.history.keeps_matches:
+            return False
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass  # Evicted by another process after loading, the loaded data is still good
+
+        if len(entry["matches"]) > 0:
+            self._replay_matches(simulation, entry["matches"], entry["round_ends"])
+        else:
+            for player, wins, losses, draws, had_bye in zip(simulation.tournament.players, entry["wins"].tolist(),
+                                                           entry["losses"].tolist(), entry["draws"].tolist(),
+                                                           entry["has_had_bye"].tolist()):
+                player.wins, player.losses, player.draws, player.has_had_bye = wins, losses, draws, had_bye
+            if "match_count" in entry:
+                simulation.history._count = int(entry["match_count"])  # Stats-only histories just count
+
+        # The stored tiebreakers are final, so nothing has to be recomputed
+        for player, tiebreaker in zip(simulation.tournament.players, entry["tiebreakers"].tolist()):
+            player.stats_changed = False
+            player._tiebreaker = tiebreaker
+        simulation.tournament.restored_ranking_columns = entry["ranking_columns"].astype(np.int64)
+        simulation.unpaired = int(entry["unpaired"]) if "unpaired" in entry else 0
+        simulation.current_round = simulation.tournament.number_of_rounds
+        return True
+
+    def _replay_matches(self, simulation: Simulation, records: np.ndarray, round_ends: np.ndarray) -> None:
+        """Record the stored matches again, round by round, without any pairing or random draws."""
+        start = 0
+        for round_number, end in enumerate(round_ends.tolist(), 1):
+            simulation.current_round = round_number
+            simulation._record_round(records[start:end])
+            simulation.history.end_round(round_number)
+            start = end
+
+    def save(self, simulation: Simulation) -> None:
+        """Store a finished simulation."""
+        key = self.key(simulation)
+        if key is None:
+            return
+        rankings = simulation.tournament.rankings()
+        players = simulation.tournament.players
+
+        records = matches_to_records(simulation.history.matches)
+        round_ends = np.array([simulation.history.round_ranges[round_number][1]
+                               for round_number in sorted(simulation.history.round_ranges)]
+                              if len(records) else [], dtype=np.int64)
+
+        # Write to a temporary file first so readers never see a partial entry
+        handle, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "wb") as f:
+            np.savez(
+                f,
+                wins=np.array([p.wins for p in players], dtype=np.int16),
+                losses=np.array([p.losses for p in players], dtype=np.int16),
+                draws=np.array([p.draws for p in players], dtype=np.int16),
+                has_had_bye=np.array([p.has_had_bye for p in players], dtype=bool),
+                tiebreakers=np.array([p.calculate_tiebreaker() for p in players]),
+                ranking_columns=np.stack([rankings.points, rankings.opp_winrate,
+                                          rankings.opp_opp_winrate, rankings.loss_rounds_score], axis=1).astype(np.int32),
+                matches=records,
+                round_ends=round_ends,
+                unpaired=np.int64(simulation.unpaired),
+                match_count=np.int64(simulation.match_count),
+            )
+        os.replace(temporary_path, self._path(key))
+        self._evict()
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        # Other processes sharing the directory may delete entries at any point
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Delete every cached entry."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass  # Removed by another process
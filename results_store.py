@@ -0,0 +1,137 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from match import Match
+from match_history import RECORD_DTYPE, DiskHistory, matches_to_records, records_to_matches
+from simulation_hooks import RoundEvent, SimulationListener
+import numpy as np
+
+class ResultsStore(SimulationListener):
+    """
+    Results of a simulation indexed for lookups:
+    - round_matches: matches of a round, a slice of the round-ordered records
+    - player_matches: a player's matches, through per-player offsets
+    - players_on_points: players on a point total, by binary search over the sorted points
+
+    Matches are kept as fixed-width records (see match_history.RECORD_DTYPE) and
+    only turned into Match objects when asked for. Build it from a finished
+    simulation with from_simulation, or register it as a listener to have it
+    updated after every round. Histories that don't keep matches leave the
+    round and player indexes empty.
+    """
+    def __init__(self, players: Sequence):
+        self.players = players
+        self.round_ranges: Dict[int, Tuple[int, int]] = {}  # round_number -> (start, end) index
+        self._chunks: List[np.ndarray] = []
+        self._records: Optional[np.ndarray] = np.empty(0, dtype=RECORD_DTYPE)
+        self._player_offsets: Optional[np.ndarray] = None
+        self._player_records: Optional[np.ndarray] = None
+        self._points_order: Optional[np.ndarray] = None
+        self._sorted_points: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_simulation(cls, simulation) -> 'ResultsStore':
+        """Index the matches played so far and the current standings of a simulation."""
+        store = cls(simulation.tournament.players)
+        history = simulation.history
+        for round_number in sorted(history.round_ranges):
+            if isinstance(history, DiskHistory):
+                start, end = history.round_ranges[round_number]
+                store.add_records(round_number, np.array(history.records()[start:end]))
+            else:
+                store.add_round(round_number, history.round_matches(round_number))
+        return store
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        self.add_round(event.round_number, simulation.history.round_matches(event.round_number))
+
+    def add_round(self, round_number: int, matches: Sequence[Match]) -> None:
+        """Add the matches of a finished round."""
+        self.add_records(round_number, matches_to_records(matches))
+
+    def add_records(self, round_number: int, records: np.ndarray) -> None:
+        """Add the match records of a finished round."""
+        start = len(self)
+        self._chunks.append(records)
+        self._records = None
+        self.round_ranges[round_number] = (start, start + len(records))
+        # Indexes are rebuilt on the next lookup
+        self._player_offsets = None
+        self._player_records = None
+        self._points_order = None
+        self._sorted_points = None
+
+    @property
+    def records(self) -> np.ndarray:
+        """All match records, in round order."""
+        if self._records is None:
+            self._records = np.concatenate(self._chunks) if self._chunks else np.empty(0, dtype=RECORD_DTYPE)
+            self._chunks = [self._records]
+        return self._records
+
+    def to_match(self, record) -> Match:
+        """Rebuild a Match from a record."""
+        return records_to_matches(np.asarray(record, dtype=RECORD_DTYPE).reshape(1), self.players)[0]
+
+    def round_numbers(self) -> List[int]:
+        """Rounds with results, in order."""
+        return sorted(self.round_ranges)
+
+    def round_records(self, round_number: int, player_id: Optional[int] = None) -> np.ndarray:
+        """Match records of the given round, only those of one player when player_id is given."""
+        start, end = self.round_ranges.get(round_number, (0, 0))
+        records = self.records[start:end]
+        if player_id is not None:
+            records = records[(records['player1'] == player_id) | (records['player2'] == player_id)]
+        return records
+
+    def round_matches(self, round_number: int) -> List[Match]:
+        """Matches played in the given round."""
+        return records_to_matches(self.round_records(round_number), self.players)
+
+    def player(self, player_id: int):
+        """The player with the given id."""
+        return self.players[player_id]
+
+    def player_matches(self, player_id: int) -> List[Match]:
+        """Matches played by the given player, in round order."""
+        if self._player_offsets is None:
+            self._build_player_index()
+        start, end = self._player_offsets[player_id], self._player_offsets[player_id + 1]
+        records = self.records[self._player_records[start:end]]
+        return records_to_matches(records, self.players)
+
+    def _build_player_index(self) -> None:
+        """Group record indices by player: player X's records are _player_records[offsets[X]:offsets[X + 1]]."""
+        records = self.records
+        indices = np.arange(len(records))
+        player_ids = np.concatenate([records['player1'], records['player2']])
+        indices = np.concatenate([indices, indices])
+        played = player_ids >= 0  # player2 is -1 for a bye
+        player_ids, indices = player_ids[played], indices[played]
+        # Records are in round order, so sorting by player then index keeps each player's rounds in order
+        order = np.lexsort((indices, player_ids))
+        self._player_records = indices[order]
+        counts = np.bincount(player_ids, minlength=len(self.players))
+        self._player_offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def players_on_points(self, points: int) -> List:
+        """Players currently on the given point total, by player_id."""
+        if self._sorted_points is None:
+            self._build_points_index()
+        start = np.searchsorted(self._sorted_points, points, side='left')
+        end = np.searchsorted(self._sorted_points, points, side='right')
+        return [self.players[i] for i in self._points_order[start:end].tolist()]
+
+    def point_totals(self) -> Dict[int, int]:
+        """Number of players on each point total."""
+        if self._sorted_points is None:
+            self._build_points_index()
+        totals, counts = np.unique(self._sorted_points, return_counts=True)
+        return dict(zip(totals.tolist(), counts.tolist()))
+
+    def _build_points_index(self) -> None:
+        points = np.fromiter((p.get_points() for p in self.players), dtype=np.int32, count=len(self.players))
+        self._points_order = np.argsort(points, kind='stable')
+        self._sorted_points = points[self._points_order]
@@ -0,0 +1,179 @@
+from typing import Dict, Iterable, List, Tuple
+from tournament import Tournament
+import math
+import numpy as np
+
+class ScoreDistribution:
+    """
+    Computes the expected number of players on each point total, round by round,
+    without simulating any matches.
+
+    Players are paired within their score group; an odd player out floats down
+    to the next group and is assumed to beat (or draw) the player they meet there,
+    since in the simulation the higher scorer is almost always the lower player_id.
+    In an odd field the lowest scorer gets the bye. Alongside the expected counts
+    a covariance matrix tracks the spread caused by draws, which gives the
+    distribution of the cut line through a normal approximation.
+    """
+    def __init__(self, number_of_players: int, draw_percentage: int):
+        self.number_of_players = number_of_players
+        self.draw_percentage = draw_percentage
+        self.number_of_rounds = Tournament.rounds_for(number_of_players)
+        # Same draw chance as random.randint(0, 100) < draw_percentage
+        self.draw_probability = min(draw_percentage, 101) / 101
+        self.max_points = 3 * self.number_of_rounds
+        self.expected_counts = np.zeros(self.max_points + 1)
+        self.covariance = np.zeros((self.max_points + 1, self.max_points + 1))
+        self._computed = False
+
+    @classmethod
+    def from_tournament(cls, tournament: Tournament) -> 'ScoreDistribution':
+        return cls(tournament.number_of_players, tournament.draw_percentage)
+
+    def compute(self) -> np.ndarray:
+        """Propagate the expected counts through every round. Returns the final counts."""
+        counts = np.zeros(self.max_points + 1)
+        counts[0] = self.number_of_players
+        covariance = np.zeros((self.max_points + 1, self.max_points + 1))
+        for _ in range(self.number_of_rounds):
+            transition = self._transition_matrix()
+            noise = self._draw_noise(counts)
+            counts = self._next_counts(counts)
+            covariance = transition @ covariance @ transition.T + noise
+        self.expected_counts = counts
+        self.covariance = covariance
+        self._computed = True
+        return counts
+
+    def _next_counts(self, counts: np.ndarray) -> np.ndarray:
+        """Expected counts after one round of Swiss pairing."""
+        draw = self.draw_probability
+        counts = counts.copy()
+        new_counts = np.zeros_like(counts)
+
+        if self.number_of_players % 2 == 1:
+            lowest = int(np.nonzero(counts > 0)[0][0])
+            bye = min(1.0, counts[lowest])
+            counts[lowest] -= bye
+            new_counts[min(lowest + 3, self.max_points)] += bye
+
+        floaters: List[Tuple[int, float]] = []  # (points, expected number of players)
+        for points in range(self.max_points, -1, -1):
+            group = counts[points]
+            # Floaters from above are paired first and take the match
+            while floaters and group > 0:
+                float_points, amount = floaters[0]
+                paired = min(amount, group)
+                new_counts[min(float_points + 3, self.max_points)] += paired * (1 - draw)
+                new_counts[min(float_points + 1, self.max_points)] += paired * draw
+                new_counts[min(points + 1, self.max_points)] += paired * draw
+                new_counts[points] += paired * (1 - draw)
+                group -= paired
+                if paired < amount:
+                    floaters[0] = (float_points, amount - paired)
+                else:
+                    floaters.pop(0)
+            if group <= 0:
+                continue
+            odd = min(float(round(group) % 2), group)
+            paired = group - odd
+            new_counts[points] += paired * (1 - draw) / 2
+            new_counts[min(points + 3, self.max_points)] += paired * (1 - draw) / 2
+            new_counts[min(points + 1, self.max_points)] += paired * draw
+            if odd > 0:
+                floaters.append((points, odd))
+
+        # Nobody left to float to: those players stay unpaired
+        for float_points, amount in floaters:
+            new_counts[float_points] += amount
+        return new_counts
+
+    def _transition_matrix(self) -> np.ndarray:
+        """Linear map of the counts for one round, ignoring floats and byes."""
+        size = self.max_points + 1
+        draw = self.draw_probability
+        transition = np.zeros((size, size))
+        for points in range(size):
+            transition[points, points] += (1 - draw) / 2
+            transition[min(points + 3, self.max_points), points] += (1 - draw) / 2
+            transition[min(points + 1, self.max_points), points] += draw
+        return transition
+
+    def _draw_noise(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Covariance added by the random number of drawn pairs in each group.
+        Each extra draw moves two players to +1 instead of one to +3 and one to +0.
+        """
+        size = self.max_points + 1
+        draw = self.draw_probability
+        noise = np.zeros((size, size))
+        for points in np.nonzero(counts > 0)[0]:
+            effect = np.zeros(size)
+            effect[min(points + 1, self.max_points)] += 2
+            effect[min(points + 3, self.max_points)] -= 1
+            effect[points] -= 1
+            noise += (counts[points] / 2) * draw * (1 - draw) * np.outer(effect, effect)
+        return noise
+
+    def probability_at_least(self, cut: int) -> np.ndarray:
+        """
+        For every point total, the probability that at least `cut` players
+        finish on that many points or more.
+        """
+        if not self._computed:
+            self.compute()
+        # Cumulative counts from the top: at_least[p] = players with >= p points
+        cumulative = np.tril(np.ones((self.max_points + 1, self.max_points + 1))).T
+        means = cumulative @ self.expected_counts
+        variances = np.einsum('ij,jk,ik->i', cumulative, self.covariance, cumulative)
+        probabilities = np.empty(self.max_points + 1)
+        for points in range(self.max_points + 1):
+            deviation = math.sqrt(max(variances[points], 0.0))
+            margin = means[points] - cut + 0.5  # Continuity correction
+            if deviation == 0:
+                probabilities[points] = 1.0 if margin > 0 else 0.0
+            else:
+                probabilities[points] = 0.5 * (1 + math.erf(margin / (deviation * math.sqrt(2))))
+        return probabilities
+
+    def cut_line_distribution(self, cut: int) -> Dict[int, float]:
+        """Probability that the last player making the cut finishes on each point total."""
+        at_least = self.probability_at_least(cut)
+        distribution = {}
+        for points in range(self.max_points + 1):
+            above = at_least[points + 1] if points < self.max_points else 0.0
+            probability = max(at_least[points] - above, 0.0)
+            if probability > 1e-9:
+                distribution[points] = float(probability)
+        return distribution
+
+    def expected_point_distribution(self) -> Dict[int, float]:
+        """Expected number of players finishing on each point total."""
+        if not self._computed:
+            self.compute()
+        return {points: float(count) for points, count in enumerate(self.expected_counts) if count > 1e-9}
+
+    def validate(self, runs: int, cuts: Iterable[int] = (8, 16, 32), seed: int = 0,
+                 max_workers: int = 1) -> Dict[int, Dict[str, Dict[int, float]]]:
+        """
+        Compare the cut-line distributions against sampled runs of Simulation.simulate.
+        Returns, per cut, the "predicted" and "sampled" distributions and their
+        "difference" per point total.
+        """
+        # Imported here so the analytical engine doesn't need the process pool machinery
+        from monte_carlo import simulate_field
+
+        cuts = list(cuts)  # Iterated more than once
+        sampled = simulate_field(self.number_of_players, self.draw_percentage, runs, seed, cuts,
+                                 max_workers=max_workers)
+        comparison = {}
+        for cut in cuts:
+            predicted = self.cut_line_distribution(cut)
+            observed = sampled.cut_line_distribution(cut)
+            comparison[cut] = {
+                "predicted": predicted,
+                "sampled": observed,
+                "difference": {points: predicted.get(points, 0.0) - observed.get(points, 0.0)
+                               for points in sorted(set(predicted) | set(observed))},
+            }
+        return comparison
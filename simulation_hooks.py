@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, TextIO
+import cProfile
+import json
+import os
+import sys
+
+# Phases of a round, in the order they run
+PHASES = ("bye", "pairing", "results", "stats")
+
+class PhaseEvent:
+    """One phase of one round: how long it took and how many items it handled."""
+    def __init__(self, round_number: int, phase: str, start: float, seconds: float, count: int):
+        self.round_number = round_number
+        self.phase = phase
+        self.start = start  # time.perf_counter() at the start of the phase
+        self.seconds = seconds
+        self.count = count  # Byes given, pairs made, results drawn or matches recorded
+
+class RoundEvent:
+    """Summary of a finished round."""
+    def __init__(self, round_number: int, number_of_rounds: int):
+        self.round_number = round_number
+        self.number_of_rounds = number_of_rounds
+        self.seconds = 0.0
+        self.phase_seconds: Dict[str, float] = {}
+        self.byes = 0
+        self.pairs = 0
+        self.repaired = 0  # Pairs added by CompletePairing for players the pairing method left over
+        self.unpaired = 0  # Players that still couldn't be paired
+        self.pairing_complete = True  # False when CompletePairing used up its max_steps
+        self.rng_draws = 0  # Random numbers drawn for match results
+
+class SimulationListener:
+    """
+    Receives events from Simulation.simulate. Override the methods you need;
+    phase events are only built when at least one listener is attached.
+    """
+    def on_simulation_start(self, simulation) -> None:
+        pass
+
+    def on_phase(self, simulation, event: PhaseEvent) -> None:
+        pass
+
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        pass
+
+    def on_simulation_end(self, simulation) -> None:
+        pass
+
+class RoundTimePrinter(SimulationListener):
+    """Prints the time of every round."""
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        print(f"Round {event.round_number} completed in {event.seconds:.2f} seconds")
+
+class ProgressBar(SimulationListener):
+    """Text progress bar for the command line."""
+    def __init__(self, stream: Optional[TextIO] = None, width: int = 30):
+        self.stream = stream or sys.stderr
+        self.width = width
+
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        done = int(self.width * event.round_number / event.number_of_rounds)
+        bar = "#" * done + "-" * (self.width - done)
+        self.stream.write(f"\r[{bar}] round {event.round_number}/{event.number_of_rounds}"
+                          f" ({event.seconds:.2f}s, {event.unpaired} unpaired)")
+        if event.round_number == event.number_of_rounds:
+            self.stream.write("\n")
+        self.stream.flush()
+
+class StreamlitProgress(SimulationListener):
+    """Updates a Streamlit progress widget, e.g. StreamlitProgress(st.progress(0.0))."""
+    def __init__(self, progress_bar):
+        self.progress_bar = progress_bar
+
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        self.progress_bar.progress(event.round_number / event.number_of_rounds,
+                                   text=f"Round {event.round_number} of {event.number_of_rounds}")
+
+class ProfileExporter(SimulationListener):
+    """Runs cProfile during the simulation and writes the stats to a file for pstats or snakeviz."""
+    def __init__(self, path: str):
+        self.path = path
+        self.profile = cProfile.Profile()
+
+    def on_simulation_start(self, simulation) -> None:
+        self.profile.enable()
+
+    def on_simulation_end(self, simulation) -> None:
+        self.profile.disable()
+        self.profile.dump_stats(self.path)
+
+class TraceExporter(SimulationListener):
+    """Writes every phase as a Chrome trace event, viewable in chrome://tracing or Perfetto."""
+    def __init__(self, path: str):
+        self.path = path
+        self.events: List[Dict] = []
+
+    def on_phase(self, simulation, event: PhaseEvent) -> None:
+        self.events.append({
+            "name": event.phase,
+            "ph": "X",
+            "ts": event.start * 1e6,
+            "dur": event.seconds * 1e6,
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": {"round": event.round_number, "count": event.count},
+        })
+
+    def on_simulation_end(self, simulation) -> None:
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self.events}, f)
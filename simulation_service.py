@@ -0,0 +1,325 @@
+"""
+Local HTTP/JSON service that runs simulations for other tools.
+
+    python simulation_service.py --port 8765 --workers 4
+
+    GET  /health
+    POST /simulate  {"players": 1024, "draw_percentage": 10, "seed": 0, "pairing": "bucket", "cuts": [8, 32]}
+
+/simulate answers with the summary of the finished tournament: rounds, matches,
+unpaired players, the points and tiebreaker at every cut and the top of the
+standings. With ?stream=1 the response is newline-delimited JSON instead: one
+{"round": ...} object per finished round, then {"result": ...}.
+
+Simulations run on a process pool. Requests with the same parameters that
+arrive while a simulation is running wait for that simulation instead of
+starting their own, and streaming requests that join late first get the
+rounds that already finished.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from result_cache import ResultCache
+from simulation_hooks import RoundEvent, SimulationListener
+from tournament import Tournament
+from tournament_simulation import Simulation
+import argparse
+import asyncio
+import json
+import multiprocessing
+import signal
+import time
+
+DEFAULT_CUTS = (8, 16, 32)
+MAX_BODY_BYTES = 64 * 1024
+
+class QueueProgress(SimulationListener):
+    """Sends a summary of every finished round to a multiprocessing queue."""
+    def __init__(self, queue, job_key: str):
+        self.queue = queue
+        self.job_key = job_key
+
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        self.queue.put((self.job_key, {
+            "round": event.round_number,
+            "rounds": event.number_of_rounds,
+            "seconds": event.seconds,
+            "unpaired": event.unpaired,
+        }))
+
+def _run_job(job_key: str, params: Dict, progress_queue, cache_directory: Optional[str]) -> Dict:
+    """
+    Run one simulation in a worker process and return its summary.
+    Its round events are followed by (job_key, None) on the progress queue,
+    also when the simulation fails.
+    """
+    try:
+        start = time.perf_counter()
+        tournament = Tournament(params["players"], params["draw_percentage"])
+        simulation = Simulation(tournament, params["pairing"], history="stats",
+                                listeners=[QueueProgress(progress_queue, job_key)], seed=params["seed"])
+        if cache_directory is not None:
+            ResultCache(cache_directory).run(simulation)
+        else:
+            simulation.simulate()
+        summary = simulation.summary(params["cuts"], params["top"])
+        summary["seconds"] = time.perf_counter() - start
+        return summary
+    finally:
+        progress_queue.put((job_key, None))
+
+def parse_params(request: Dict) -> Dict:
+    """Validate a /simulate request and fill in the defaults. Raises ValueError for bad input."""
+    if not isinstance(request, dict):
+        raise ValueError("Request body must be a JSON object")
+    try:
+        params = {
+            "players": int(request["players"]),
+            "draw_percentage": int(request.get("draw_percentage", 0)),
+            "seed": int(request.get("seed", 0)),
+            "pairing": str(request.get("pairing", "bucket")),
+            "cuts": sorted({int(cut) for cut in request.get("cuts", DEFAULT_CUTS)}),
+            "top": int(request.get("top", 32)),
+        }
+    except KeyError as error:
+        raise ValueError(f"Missing field: {error.args[0]}") from None
+    except (TypeError, ValueError):
+        raise ValueError("Fields must be integers, pairing a string and cuts a list of integers") from None
+    if params["players"] < 2:
+        raise ValueError("A tournament needs at least 2 players")
+    if not 0 <= params["draw_percentage"] <= 100:
+        raise ValueError("draw_percentage must be between 0 and 100")
+    if params["pairing"] not in Simulation.PAIRING_METHODS:
+        raise ValueError(f"Unknown pairing method: {params['pairing']}")
+    if any(cut < 1 for cut in params["cuts"]) or params["top"] < 0:
+        raise ValueError("cuts must be positive and top can't be negative")
+    return params
+
+class Job:
+    """One simulation in flight, shared by every request with the same parameters."""
+    def __init__(self, key: str, params: Dict):
+        self.key = key
+        self.params = params
+        self.requests = 1
+        self.progress: List[Dict] = []  # Rounds finished so far
+        self.finished = False  # Set once every round event has been published
+        self.subscribers: List[asyncio.Queue] = []
+        self.result: Optional[asyncio.Future] = None
+
+    def publish(self, event: Optional[Dict]) -> None:
+        """Pass a round event (or None once finished) to every streaming request."""
+        if event is None:
+            self.finished = True
+        else:
+            self.progress.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue of the rounds of this job, starting with those already finished."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.progress:
+            queue.put_nowait(event)
+        if self.finished:
+            queue.put_nowait(None)
+        self.subscribers.append(queue)
+        return queue
+
+class SimulationService:
+    """Serves /simulate and /health, see the module docstring."""
+    def __init__(self, max_workers: Optional[int] = None, cache_directory: Optional[str] = None):
+        self.max_workers = max_workers
+        self.cache_directory = cache_directory
+        self.jobs: Dict[str, Job] = {}
+        self.jobs_started = 0
+        self.requests = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress_queue = None
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        """Start the workers and serve until cancelled or terminated."""
+        loop = asyncio.get_running_loop()
+        serving = asyncio.current_task()
+        try:
+            # Shut the workers down cleanly on SIGTERM too, not only on Ctrl+C
+            loop.add_signal_handler(signal.SIGTERM, serving.cancel)
+        except NotImplementedError:  # Windows event loops have no signal handlers
+            pass
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        self._manager = context.Manager()
+        self._progress_queue = self._manager.Queue()
+        forwarder = asyncio.create_task(self._forward_progress())
+        server = await asyncio.start_server(self._handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._progress_queue.put(None)
+            await forwarder
+            self._executor.shutdown(cancel_futures=True)
+            self._manager.shutdown()
+
+    def submit(self, params: Dict) -> Job:
+        """The job for the given parameters, started unless an identical one is running."""
+        key = json.dumps(params, sort_keys=True)
+        job = self.jobs.get(key)
+        if job is not None:
+            job.requests += 1
+            return job
+        job = Job(key, params)
+        loop = asyncio.get_running_loop()
+        job.result = loop.run_in_executor(self._executor, _run_job, key, params,
+                                          self._progress_queue, self.cache_directory)
+        job.result.add_done_callback(lambda future: self._on_job_done(job, future))
+        self.jobs[key] = job
+        self.jobs_started += 1
+        return job
+
+    def _on_job_done(self, job: Job, future: asyncio.Future) -> None:
+        """
+        Jobs normally finish when their end marker comes through the progress
+        queue, after all their round events. Jobs that never ran or whose worker
+        died send no marker, so they finish here.
+        """
+        if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+            self._finish(job)
+
+    def _finish(self, job: Job) -> None:
+        if self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+            job.publish(None)
+
+    async def _forward_progress(self) -> None:
+        """Pass round events from the workers to the jobs they belong to, and finish jobs at their end marker."""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self._progress_queue.get)
+            if item is None:
+                return
+            job_key, event = item
+            job = self.jobs.get(job_key)
+            if job is None:
+                continue
+            if event is None:
+                self._finish(job)
+            else:
+                job.publish(event)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # Only a bad request is a 400, failures of the job itself are reported as 500
+            try:
+                method, target, body = await self._read_request(reader)
+                url = urlsplit(target)
+                params = None
+                if url.path == "/simulate" and method == "POST":
+                    self.requests += 1
+                    params = parse_params(json.loads(body or b"{}"))
+            except ValueError as error:  # Includes malformed JSON
+                await self._respond(writer, 400, {"error": str(error)})
+                return
+            if url.path == "/health" and method == "GET":
+                await self._respond(writer, 200, {
+                    "in_flight": len(self.jobs),
+                    "jobs_started": self.jobs_started,
+                    "requests": self.requests,
+                })
+            elif params is not None:
+                job = self.submit(params)
+                if parse_qs(url.query).get("stream", ["0"])[0] not in ("0", "false", ""):
+                    await self._stream(writer, job)
+                else:
+                    await self._respond(writer, 200, await job.result)
+            elif url.path in ("/health", "/simulate"):
+                await self._respond(writer, 405, {"error": f"{method} not allowed"})
+            else:
+                await self._respond(writer, 404, {"error": f"Unknown path: {url.path}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as error:
+            await self._respond(writer, 500, {"error": f"{type(error).__name__}: {error}"})
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        """Read a request line, the headers and the body."""
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise ValueError("Malformed request line")
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, body
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(self._status_line(status) + (
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, job: Job) -> None:
+        """Send every round of the job as it finishes, then the result, as chunked NDJSON."""
+        writer.write(self._status_line(200) + (
+            "Content-Type: application/x-ndjson\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            "Connection: close\r\n\r\n").encode())
+        queue = job.subscribe()
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                await self._write_chunk(writer, {"round": event})
+            # The headers are sent already, so a failed job ends the stream with an error chunk
+            try:
+                payload = {"result": await job.result}
+            except Exception as error:
+                payload = {"error": f"{type(error).__name__}: {error}"}
+            await self._write_chunk(writer, payload)
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            job.subscribers.remove(queue)
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, payload: Dict) -> None:
+        data = json.dumps(payload).encode() + b"\n"
+        writer.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        await writer.drain()
+
+    def _status_line(self, status: int) -> bytes:
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   500: "Internal Server Error"}
+        return f"HTTP/1.1 {status} {reasons[status]}\r\n".encode()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve tournament simulations over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--cache-dir", default=None, help="Reuse finished simulations from this result cache")
+    args = parser.parse_args()
+    service = SimulationService(args.workers, args.cache_dir)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from typing import List, Optional, Tuple
+from match import Match
+from result_cache import ResultCache
+from simulation_hooks import PhaseEvent, RoundEvent, SimulationListener
+from tournament_simulation import Simulation
+import heapq
+import threading
+import time
+
+class SimulationCancelled(Exception):
+    """Raised inside a running simulation to stop it."""
+
+class RoundSnapshot:
+    """What the UI needs to show of a finished round while the simulation continues."""
+    def __init__(self, event: RoundEvent, matches: List[Match], standings: List[Tuple[int, int, int, int, int]]):
+        self.round_number = event.round_number
+        self.seconds = event.seconds
+        self.unpaired = event.unpaired
+        self.matches = matches
+        self.standings = standings  # (player_id, points, wins, losses, draws), best first
+
+class SimulationRunner(SimulationListener):
+    """
+    Runs a Simulation in a background thread.
+    After every round a snapshot of the round's matches and the top of the
+    standings is stored, so callers can poll for progress without touching
+    players that are still being updated. cancel() stops the run at the next phase.
+    With a cache, repeated seeded runs are loaded instead of simulated.
+    """
+    def __init__(self, simulation: Simulation, standings_limit: int = 128, cache: Optional[ResultCache] = None):
+        self.simulation = simulation
+        self.cache = cache  # Finished runs are stored here and repeated runs loaded from it
+        self.cache_hit = False
+        self.standings_limit = standings_limit
+        self.rounds: List[RoundSnapshot] = []
+        self.cancelled = False
+        self.error: Optional[BaseException] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel_requested = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        simulation.add_listener(self)
+
+    def start(self) -> None:
+        """Start the simulation and return immediately."""
+        self.started_at = time.time()
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """Ask the simulation to stop after the phase it is in."""
+        self._cancel_requested.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the simulation to finish."""
+        self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def done(self) -> bool:
+        """True once the simulation finished all rounds."""
+        return self.finished_at is not None and not self.cancelled and self.error is None
+
+    @property
+    def progress(self) -> float:
+        """Fraction of rounds finished."""
+        return len(self.rounds) / max(self.simulation.tournament.number_of_rounds, 1)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the start, or the total time once finished."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def _run(self) -> None:
+        try:
+            if self.cache is not None:
+                self.cache_hit = self.cache.run(self.simulation)
+            else:
+                self.simulation.simulate()
+        except SimulationCancelled:
+            self.cancelled = True
+        except Exception as error:
+            self.error = error
+        finally:
+            self.finished_at = time.time()
+
+    def on_phase(self, simulation, event: PhaseEvent) -> None:
+        if self._cancel_requested.is_set():
+            raise SimulationCancelled()
+
+    def on_round_end(self, simulation, event: RoundEvent) -> None:
+        players = simulation.tournament.players
+        top = heapq.nlargest(self.standings_limit, players, key=lambda p: p.get_points())
+        standings = [(p.player_id, p.get_points(), p.wins, p.losses, p.draws) for p in top]
+        matches = simulation.history.round_matches(event.round_number)
+        self.rounds.append(RoundSnapshot(event, matches, standings))
+        if self._cancel_requested.is_set():
+            raise SimulationCancelled()
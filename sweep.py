@@ -0,0 +1,123 @@
+"""
+Headless parameter sweeps: simulate every combination of player counts, draw
+percentages and seeds in parallel and write one summary row per run.
+
+    python sweep.py --players 64 1024 16384 --draws 0 10 --runs 20 --output sweep.csv
+    python sweep.py --players 512 --seeds 7 8 9 --format json
+
+Only the simulation core is imported, and only in the worker processes, so
+the command starts fast and runs without the UI dependencies.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+DEFAULT_CUTS = [8, 16, 32]
+ROW_FIELDS = ["players", "draw_percentage", "seed", "pairing", "storage", "rounds", "matches", "unpaired", "seconds"]
+
+def run_one(number_of_players: int, draw_percentage: int, seed: int, pairing: str,
+            storage: str, cuts: Tuple[int, ...]) -> Dict:
+    """Simulate one tournament and return its summary as a flat row."""
+    from tournament import Tournament
+    from tournament_simulation import Simulation
+
+    start = time.perf_counter()
+    tournament = Tournament(number_of_players, draw_percentage, storage)
+    simulation = Simulation(tournament, pairing, history="stats", seed=seed)
+    simulation.simulate()
+    summary = simulation.summary(cuts)
+    row = {field: summary.get(field) for field in ROW_FIELDS}
+    row["storage"] = storage
+    row["seconds"] = round(time.perf_counter() - start, 4)
+    for cut in cuts:
+        cut_line = summary["cut_lines"].get(str(cut), {})
+        row[f"cut_{cut}_points"] = cut_line.get("points")
+        row[f"cut_{cut}_tiebreaker"] = cut_line.get("tiebreaker")
+    return row
+
+def _run_case(case: Tuple) -> Dict:
+    return run_one(*case)
+
+def aggregate(rows: List[Dict], cuts: List[int]) -> List[Dict]:
+    """Per player count and draw percentage: runs, mean time and the distribution of every cut line."""
+    groups: Dict[Tuple[int, int], List[Dict]] = {}
+    for row in rows:
+        groups.setdefault((row["players"], row["draw_percentage"]), []).append(row)
+    summaries = []
+    for (number_of_players, draw_percentage), group in sorted(groups.items()):
+        summary = {
+            "players": number_of_players,
+            "draw_percentage": draw_percentage,
+            "runs": len(group),
+            "mean_seconds": sum(row["seconds"] for row in group) / len(group),
+            "unpaired": sum(row["unpaired"] for row in group),
+            "cut_lines": {},
+        }
+        for cut in cuts:
+            points = [row[f"cut_{cut}_points"] for row in group if row[f"cut_{cut}_points"] is not None]
+            summary["cut_lines"][str(cut)] = {str(total): points.count(total) / len(group)
+                                              for total in sorted(set(points))}
+        summaries.append(summary)
+    return summaries
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run parameter sweeps of tournament simulations without the UI.")
+    parser.add_argument("--players", type=int, nargs="+", required=True)
+    parser.add_argument("--draws", type=int, nargs="+", default=[0])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--runs", type=int, help="Use the seeds 0 to runs-1 instead of --seeds")
+    parser.add_argument("--pairing", choices=["greedy", "bucket"], default="bucket")
+    parser.add_argument("--storage", choices=["objects", "compact"], default="objects")
+    parser.add_argument("--cuts", type=int, nargs="+", default=DEFAULT_CUTS)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=["csv", "json"], help="Output format (default: from --output, else csv)")
+    parser.add_argument("--output", help="Write to this file instead of stdout")
+    args = parser.parse_args()
+
+    if min(args.players) < 2:
+        parser.error("--players must be at least 2")
+    if not all(0 <= draw <= 100 for draw in args.draws):
+        parser.error("--draws must be between 0 and 100")
+    output_format = args.format or ("json" if args.output and args.output.endswith(".json") else "csv")
+    seeds = list(range(args.runs)) if args.runs is not None else args.seeds
+    cuts = tuple(sorted(set(args.cuts)))
+    cases = [(number_of_players, draw_percentage, seed, args.pairing, args.storage, cuts)
+             for number_of_players, draw_percentage, seed in itertools.product(args.players, args.draws, seeds)]
+
+    start = time.perf_counter()
+    rows = []
+    workers = args.workers or os.cpu_count() or 1
+    if workers == 1:
+        results = map(_run_case, cases)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_run_case, cases)
+    for done, row in enumerate(results, 1):
+        rows.append(row)
+        print(f"\r{done}/{len(cases)} runs", end="", file=sys.stderr)
+    if workers != 1:
+        executor.shutdown()
+    print(f"\n{len(cases)} runs in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if output_format == "json":
+            json.dump({"runs": rows, "summaries": aggregate(rows, list(cuts))}, out, indent=2)
+            out.write("\n")
+        else:
+            writer = csv.DictWriter(out, fieldnames=list(rows[0]) if rows else ROW_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+from checkpoints import Checkpoints
+from tournament import Tournament
+from tournament_simulation import Simulation
+
+def _results(simulation):
+    tournament = simulation.tournament
+    matches = [(m.player1.player_id, m.player2.player_id if m.player2 else -1,
+                m.result.player_id if m.result else -1, m.round_number) for m in simulation.matches]
+    return matches, [p.player_id for p in tournament.get_rankings()], simulation.unpaired
+
+def test_branch_without_seed_reproduces_the_original_run(tmp_path):
+    for pairing in Simulation.PAIRING_METHODS:
+        checkpoints = Checkpoints()
+        original = Simulation(Tournament(45, 10), pairing, history="memory", listeners=[checkpoints], seed=8)
+        original.simulate()
+        expected = _results(original)
+        # Also through a save and load
+        path = str(tmp_path / f"{pairing}.npz")
+        checkpoints.save(path)
+        for source in (checkpoints, Checkpoints.load(path)):
+            for round_number in (0, 1, 3, source.last_round):
+                for storage in Tournament.STORAGE_TYPES:
+                    branch = source.branch(round_number, history="memory", storage=storage)
+                    branch.simulate(first_round=round_number + 1)
+                    assert _results(branch) == expected, (pairing, round_number, storage)
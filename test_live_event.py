@@ -0,0 +1,16 @@
+import pytest
+from live_event import LiveEvent
+
+def test_ingest_rejects_round_before_the_first():
+    event = LiveEvent(["alice", "bob", "carol", "dave"], draw_percentage=0, number_of_rounds=3)
+    with pytest.raises(ValueError):
+        event.ingest([{"round": "0", "player1": "alice", "player2": "bob", "winner": "alice"}])
+    assert len(event.records()) == 0
+
+def test_ingest_rejects_player_against_themselves():
+    event = LiveEvent(["alice", "bob", "carol", "dave"], draw_percentage=0, number_of_rounds=3)
+    with pytest.raises(ValueError):
+        event.ingest([{"round": "1", "player1": "alice", "player2": "alice", "winner": "alice"}])
+    assert len(event.records()) == 0
+    # A valid result for the same player is still accepted afterwards
+    assert event.ingest([{"round": "1", "player1": "alice", "player2": "bob", "winner": "alice"}]) == 1
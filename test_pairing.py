@@ -0,0 +1,86 @@
+import functools
+import random
+from pairing import CompletePairing
+from simulation_hooks import SimulationListener
+from tournament import Tournament
+from tournament_simulation import Simulation
+
+def _maximum_matching_size(number_of_players, edges):
+    """Size of a maximum matching, by brute force over subsets of players."""
+    @functools.lru_cache(maxsize=None)
+    def best(remaining):
+        if remaining == 0:
+            return 0
+        first = (remaining & -remaining).bit_length() - 1
+        rest = remaining & ~(1 << first)
+        size = best(rest)
+        for other in range(first + 1, number_of_players):
+            if rest >> other & 1 and (first, other) in edges:
+                size = max(size, 1 + best(rest & ~(1 << other)))
+        return size
+    return best((1 << number_of_players) - 1)
+
+def test_complete_pairing_is_maximum():
+    rng = random.Random(1)
+    for _ in range(300):
+        number_of_players = rng.randint(2, 14)
+        tournament = Tournament(number_of_players, 0)
+        # Players that already met can't be paired again
+        density = rng.random()
+        edges = set()
+        for i in range(number_of_players):
+            for j in range(i + 1, number_of_players):
+                if rng.random() < density:
+                    tournament.rematch_index.add(i, j)
+                    tournament.rematch_index.add(j, i)
+                else:
+                    edges.add((i, j))
+        points = [3 * rng.randint(0, 4) for _ in range(number_of_players)]
+
+        # Start from a greedy pairing, as the pairing methods would
+        player_ids = list(range(number_of_players))
+        rng.shuffle(player_ids)
+        pairs, paired = [], set()
+        for player_id in player_ids:
+            if player_id in paired:
+                continue
+            for other in player_ids:
+                if other not in paired and other != player_id \
+                        and (min(player_id, other), max(player_id, other)) in edges:
+                    pairs.append((player_id, other))
+                    paired.update((player_id, other))
+                    break
+        unpaired = [player_id for player_id in player_ids if player_id not in paired]
+
+        completed, still_unpaired, finished = CompletePairing(tournament.rematch_index).complete(
+            player_ids, points, pairs, unpaired)
+        assert finished
+        paired_ids = [player_id for pair in completed for player_id in pair]
+        assert len(paired_ids) == len(set(paired_ids))
+        assert all((min(a, b), max(a, b)) in edges for a, b in completed)
+        assert len(completed) == _maximum_matching_size(number_of_players, frozenset(edges))
+        assert len(still_unpaired) + len(paired_ids) == number_of_players
+
+def test_complete_pairing_step_cap_is_deterministic():
+    def run(max_steps):
+        tournament = Tournament(33, 10, number_of_rounds=30)
+        simulation = Simulation(tournament, "bucket", history="memory", seed=3)
+        simulation.completer.max_steps = max_steps
+        complete = []
+        simulation.add_listener(_CompleteListener(complete))
+        simulation.simulate()
+        matches = [(m.player1.player_id, m.player2.player_id if m.player2 else -1) for m in simulation.matches]
+        return matches, complete
+
+    # A cap this small runs out in the later rounds, and always at the same point
+    matches, complete = run(50)
+    assert not all(complete)
+    assert run(50) == (matches, complete)
+    assert all(run(20_000_000)[1])
+
+class _CompleteListener(SimulationListener):
+    def __init__(self, complete):
+        self.complete = complete
+
+    def on_round_end(self, simulation, event):
+        self.complete.append(event.pairing_complete)
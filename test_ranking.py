@@ -0,0 +1,56 @@
+import numpy as np
+from ranking import Rankings
+from simulation_hooks import SimulationListener
+from tournament import Tournament
+from tournament_simulation import Simulation
+from vectorized_simulation import BatchSimulation
+
+def test_rankings_top_indices_resolves_ties_at_the_cut_by_index():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        # Few distinct values, so most cuts fall inside a group of tied players
+        columns = rng.integers(0, 3, size=(40, 4))
+        order = Rankings(list(range(40)), columns).order()
+        for k in range(1, 41):
+            top = Rankings(list(range(40)), columns).top_indices(k)  # Fresh, so order() isn't cached
+            assert top.tolist() == order[:k].tolist()
+
+def test_batch_top_indices_resolves_ties_at_the_cut_by_index():
+    batch = BatchSimulation(30, 0, 20, seed=1, number_of_rounds=1)
+    rng = np.random.default_rng(2)
+    batch.wins[:] = rng.integers(0, 3, size=batch.wins.shape)
+    batch.draws[:] = rng.integers(0, 2, size=batch.draws.shape)
+    keys = batch.ranking_keys()
+    for k in (1, 5, 13, 30):
+        expected = np.argsort(-keys, axis=1, kind='stable')[:, :k]
+        assert batch.top_indices(k).tolist() == expected.tolist()
+
+def _exact_tiebreaker(player) -> str:
+    """The tiebreaker string computed from scratch, walking opponents and their opponents."""
+    averages = player._tiebreaker_averages(exact=True)
+    if averages is None:
+        return f"{player.get_points()}00000000"
+    return player._format_tiebreaker(player.get_points(), *averages)
+
+class _CheckCaches(SimulationListener):
+    """Compares the cached tiebreakers and ranking columns with a from-scratch computation after every round."""
+    def __init__(self):
+        self.rounds_checked = 0
+
+    def on_round_end(self, simulation, event):
+        tournament = simulation.tournament
+        rankings = tournament.rankings()
+        columns = np.stack([rankings.points, rankings.opp_winrate, rankings.opp_opp_winrate,
+                            rankings.loss_rounds_score], axis=1)
+        assert columns.tolist() == [list(p.tiebreaker_key()) for p in tournament.players]
+        assert [p.calculate_tiebreaker() for p in tournament.players] == \
+            [_exact_tiebreaker(p) for p in tournament.players]
+        self.rounds_checked += 1
+
+def test_cached_tiebreakers_and_ranking_columns_match_from_scratch():
+    for storage in Tournament.STORAGE_TYPES:
+        for pairing in Simulation.PAIRING_METHODS:
+            tournament = Tournament(41, 10, storage)
+            check = _CheckCaches()
+            Simulation(tournament, pairing, history="stats", listeners=[check], seed=4).simulate()
+            assert check.rounds_checked == tournament.number_of_rounds
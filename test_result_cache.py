@@ -0,0 +1,25 @@
+from result_cache import ResultCache
+from tournament import Tournament
+from tournament_simulation import Simulation
+
+def _state(simulation):
+    tournament = simulation.tournament
+    return {
+        "ranking": [p.player_id for p in tournament.get_rankings()],
+        "tiebreakers": [p.calculate_tiebreaker() for p in tournament.players],
+        "records": [(p.wins, p.losses, p.draws, p.has_had_bye) for p in tournament.players],
+        "matches": [(m.player1.player_id, m.player2.player_id if m.player2 else -1,
+                     m.result.player_id if m.result else -1, m.round_number) for m in simulation.matches],
+        "match_count": simulation.match_count,
+        "unpaired": simulation.unpaired,
+    }
+
+def test_round_trip_for_every_history_backend(tmp_path):
+    for storage in Tournament.STORAGE_TYPES:
+        for history in ("memory", "stats", "disk"):
+            cache = ResultCache(str(tmp_path / f"{storage}-{history}"))
+            original = Simulation(Tournament(37, 10, storage), "bucket", history=history, seed=6)
+            assert not cache.run(original)  # Simulated and stored
+            restored = Simulation(Tournament(37, 10, storage), "bucket", history=history, seed=6)
+            assert cache.run(restored)  # Loaded from the cache
+            assert _state(restored) == _state(original), (storage, history)
@@ -0,0 +1,31 @@
+from tournament import Tournament
+from tournament_simulation import Simulation
+
+def _results(simulation):
+    tournament = simulation.tournament
+    return {
+        "ranking": [p.player_id for p in tournament.get_rankings()],
+        "tiebreakers": [p.calculate_tiebreaker() for p in tournament.players],
+        "records": [(p.wins, p.losses, p.draws, p.has_had_bye) for p in tournament.players],
+        "match_count": simulation.match_count,
+        "unpaired": simulation.unpaired,
+    }
+
+def _matches(simulation):
+    return [(m.player1.player_id, m.player2.player_id if m.player2 else -1,
+             m.result.player_id if m.result else -1, m.round_number) for m in simulation.matches]
+
+def test_storage_and_history_dont_change_results():
+    for pairing in Simulation.PAIRING_METHODS:
+        results, matches = [], []
+        for storage in Tournament.STORAGE_TYPES:
+            for history in ("memory", "stats", "disk"):
+                simulation = Simulation(Tournament(53, 10, storage), pairing, history=history, seed=11)
+                simulation.simulate()
+                results.append(_results(simulation))
+                if simulation.history.keeps_matches:
+                    matches.append(_matches(simulation))
+                if history == "disk":
+                    simulation.history.delete()
+        assert all(result == results[0] for result in results[1:]), pairing
+        assert all(played == matches[0] for played in matches[1:]), pairing
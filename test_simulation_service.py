@@ -0,0 +1,42 @@
+import asyncio
+import json
+from simulation_service import Job, SimulationService
+
+class FailingService(SimulationService):
+    """Jobs fail in the worker with a ValueError, without starting any workers."""
+    def submit(self, params):
+        job = Job(json.dumps(params, sort_keys=True), params)
+        job.result = asyncio.get_running_loop().create_future()
+        job.result.set_exception(ValueError("worker failed"))
+        job.publish(None)
+        return job
+
+def _request(raw: bytes) -> str:
+    async def run():
+        server = await asyncio.start_server(FailingService()._handle, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        writer.write(raw)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        server.close()
+        return response.decode()
+    return asyncio.run(run())
+
+def _simulate(query: str = "", body: bytes = b'{"players": 16}') -> str:
+    return _request(f"POST /simulate{query} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+
+def test_bad_request_is_400():
+    assert _simulate(body=b"{x}").startswith("HTTP/1.1 400 ")
+    assert _simulate(body=b'{"players": 1}').startswith("HTTP/1.1 400 ")
+
+def test_job_failure_is_500():
+    response = _simulate()
+    assert response.startswith("HTTP/1.1 500 ")
+    assert "ValueError: worker failed" in response
+
+def test_streamed_job_failure_ends_with_error_chunk():
+    response = _simulate("?stream=1")
+    assert response.startswith("HTTP/1.1 200 ")
+    assert '{"error": "ValueError: worker failed"}' in response
+    assert response.endswith("0\r\n\r\n")
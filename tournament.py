@@ -1,28 +1,153 @@
-from typing import List
+from array import array
+from typing import List, Optional, Sequence
 import math
+import numpy as np
 from player import Player
+from player_store import BYE, DRAW, LOSS, WIN, PlayerStore, player_results
+from ranking import Rankings, ranking_columns
+from rematch_index import RematchIndex
 
 class Tournament:
-    def __init__(self, number_of_players: int, draw_percentage: int):
+    STORAGE_TYPES = ("objects", "compact")
+
+    def __init__(self, number_of_players: int, draw_percentage: int, storage: str = "objects",
+                 number_of_rounds: Optional[int] = None):
+        if storage not in self.STORAGE_TYPES:
+            raise ValueError(f"Unknown player storage: {storage}")
         self.number_of_players = number_of_players
         self.draw_percentage = draw_percentage
-        self.number_of_rounds = self._calculate_rounds()
+        # Real events may announce their own number of rounds
+        self.number_of_rounds = number_of_rounds if number_of_rounds is not None else self.rounds_for(number_of_players)
+        self.storage = storage
+        self.player_store = None  # Only set for compact storage
+        # Compact storage saves the per-player opponent sets and walks the index columns instead
+        self.rematch_index = RematchIndex(number_of_players, opponent_sets=storage != "compact")
+        self.restored_ranking_columns = None  # Final ranking columns loaded by ResultCache
         self.players = self._initialize_players()
         
-    def _calculate_rounds(self) -> int:
+    @staticmethod
+    def rounds_for(number_of_players: int) -> int:
         """Calculate number of rounds based on log2(number_of_players), rounded up."""
-        return math.ceil(math.log2(self.number_of_players))
+        return math.ceil(math.log2(number_of_players))
     
     def _initialize_players(self) -> List[Player]:
         """Initialize the list of players based on the number_of_players."""
-        return [Player(player_id=i) for i in range(self.number_of_players)]
+        if self.storage == "compact":
+            self.player_store = PlayerStore(self.number_of_players, self.number_of_rounds, self.rematch_index)
+            return self.player_store.views
+        return [Player(player_id=i, rematch_index=self.rematch_index) for i in range(self.number_of_players)]
     
+    def points(self) -> List[int]:
+        """Points of every player, indexed by player_id."""
+        if self.player_store is not None:
+            return self.player_store.points()
+        return [player.get_points() for player in self.players]
+
+    def had_byes(self) -> Sequence[bool]:
+        """Whether each player has had a bye, indexed by player_id."""
+        if self.player_store is not None:
+            return self.player_store.has_had_bye
+        return [player.has_had_bye for player in self.players]
+
+    def load_records(self, records: np.ndarray) -> None:
+        """
+        Put already played matches, given as match_history.RECORD_DTYPE records,
+        into the players of a tournament without matches. Counters, opponents and
+        the rematch index are set in bulk, which is much faster than recording
+        the matches one by one; match histories of the players are left empty.
+        """
+        n = self.number_of_players
+        number_of_rounds = int(records['round_number'].max(initial=0))
+        # One entry per player per match: the player, the opponent and the result code
+        player, opponent, rounds, codes = player_results(records)
+        opponents = np.full((n, number_of_rounds), -1, dtype=np.int32)
+        opponents[player, rounds] = opponent
+        results = np.zeros((n, number_of_rounds), dtype=np.int8)
+        results[player, rounds] = codes
+
+        lost = codes == LOSS
+        wins = np.bincount(player[(codes == WIN) | (codes == BYE)], minlength=n)
+        draws = np.bincount(player[codes == DRAW], minlength=n)
+        losses = np.bincount(player[lost], minlength=n)
+        loss_rounds_sum = np.bincount(player[lost], weights=(rounds[lost] + 1) ** 2, minlength=n).astype(np.int64)
+        has_had_bye = np.bincount(player[codes == BYE], minlength=n) > 0
+        has_played = np.bincount(player, minlength=n) > 0
+
+        self.rematch_index.load(opponents)
+        store = self.player_store
+        if store is not None:
+            store.ensure_round(number_of_rounds - 1)
+            for i in range(number_of_rounds):
+                store.round_opponents[i] = array('i', np.ascontiguousarray(opponents[:, i]).tobytes())
+                store.round_results[i] = array('b', np.ascontiguousarray(results[:, i]).tobytes())
+            store.wins = array('h', wins.astype(np.int16).tobytes())
+            store.draws = array('h', draws.astype(np.int16).tobytes())
+            store.losses = array('h', losses.astype(np.int16).tobytes())
+            store.loss_rounds_sum = array('i', loss_rounds_sum.astype(np.int32).tobytes())
+            store.has_had_bye = array('b', has_had_bye.astype(np.int8).tobytes())
+            store.stats_changed = array('b', has_played.astype(np.int8).tobytes())
+            store.tiebreakers = [None] * n
+            return
+
+        players = self.players
+        for p, row, p_wins, p_draws, p_losses, p_loss_rounds_sum, p_bye, p_played in zip(
+                players, opponents.tolist(), wins.tolist(), draws.tolist(), losses.tolist(),
+                loss_rounds_sum.tolist(), has_had_bye.tolist(), has_played.tolist()):
+            p.wins, p.draws, p.losses = p_wins, p_draws, p_losses
+            p.loss_rounds_sum = p_loss_rounds_sum
+            p.has_had_bye = p_bye
+            p.opponents = [players[j] for j in row if j >= 0]
+            if p._opponents_faced is not None:
+                p._opponents_faced = {opponent.player_id for opponent in p.opponents}
+            p.stats_changed = p_played
+            p._tiebreaker = None
+
+    def refresh_tiebreakers(self) -> None:
+        """
+        Refresh the tiebreaker aggregates of players affected by new matches.
+        A changed record moves the opponent win rate of the player's opponents, and
+        through them the opponent's opponent win rate one step further out, so only
+        those players are recomputed. Cheap to call when nothing changed.
+        Compact storage recomputes everyone at once on its arrays instead.
+        """
+        store = self.player_store
+        if store is not None:
+            if any(store.stats_changed):
+                self.restored_ranking_columns = None
+                store.refresh_tiebreakers()
+            return
+        changed = [p for p in self.players if p.stats_changed]
+        if not changed:
+            return
+        self.restored_ranking_columns = None
+
+        affected = set(changed)
+        for player in changed:
+            affected.update(player.opponents)
+        for player in affected:
+            player.refresh_opponent_winrate()
+
+        second_level = set(affected)
+        for player in affected:
+            second_level.update(player.opponents)
+        for player in second_level:
+            player.refresh_opponent_opponent_winrate()
+
+        for player in changed:
+            player.stats_changed = False
+
+    def rankings(self) -> Rankings:
+        """
+        Refresh the tiebreakers and return the standings as array columns,
+        for full rankings, top-K and cut-line queries.
+        """
+        self.refresh_tiebreakers()
+        if self.restored_ranking_columns is not None:
+            return Rankings(self.players, self.restored_ranking_columns)
+        return Rankings(self.players, ranking_columns(self.players, self.player_store))
+
     def get_rankings(self) -> List[Player]:
         """
         Return players sorted by points and tiebreaker.
         """
-        return sorted(
-            self.players,
-            key=lambda p: (p.get_points(), p.calculate_tiebreaker()),
-            reverse=True
-        ) 
\ No newline at end of file
+        return self.rankings().ranked_players()
@@ -1,161 +1,298 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from tournament import Tournament
 from match import Match
+from match_history import RECORD_DTYPE, MatchHistory, create_history, records_to_matches
+from pairing import BucketPairer, CompletePairing
+from simulation_hooks import PhaseEvent, RoundEvent, SimulationListener
 import itertools
+import numpy as np
 import random
 import time
 
+# Bump whenever a change makes the same seed produce different results
+ENGINE_VERSION = 5
+
 class Simulation:
-    def __init__(self, tournament: Tournament):
+    PAIRING_METHODS = ("greedy", "bucket")
+
+    def __init__(self, tournament: Tournament, pairing: str = "greedy",
+                 history: str = "memory", history_path: Optional[str] = None,
+                 listeners: Optional[List[SimulationListener]] = None,
+                 seed: Optional[Union[int, str]] = None):
+        """
+        history selects where matches are kept: "memory" keeps every Match,
+        "stats" keeps only what standings and tiebreakers need and "disk" streams
+        matches to an append-only file at history_path (by default a temporary
+        file, deleted with the history).
+        listeners receive round and phase events, see simulation_hooks.
+        seed makes the run reproducible; without one the results are random.
+        """
+        if pairing not in self.PAIRING_METHODS:
+            raise ValueError(f"Unknown pairing method: {pairing}")
         self.tournament = tournament
-        self.matches: List[Match] = []
+        self.history: MatchHistory = create_history(history, tournament.players, history_path)
         self.current_round = 0
+        self.unpaired = 0  # Players left without a match, summed over all rounds
+        self.pairing = pairing
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.pairer = BucketPairer(tournament.rematch_index) if pairing == "bucket" else None
+        # Pairs up whoever the pairing method left over, see CompletePairing
+        self.completer = CompletePairing(tournament.rematch_index)
+        self.listeners: List[SimulationListener] = list(listeners or [])
+
+    def add_listener(self, listener: SimulationListener) -> None:
+        """Attach a listener for round and phase events."""
+        self.listeners.append(listener)
+
+    @property
+    def matches(self) -> Sequence[Match]:
+        """All matches played so far, as far as the history backend keeps them."""
+        return self.history.matches
+
+    @property
+    def match_count(self) -> int:
+        """Number of matches (including byes) played so far."""
+        return len(self.history)
         
-    def simulate(self) -> None:
+    def simulate(self, first_round: int = 1) -> None:
         """
         Simulates multiple rounds of matches between players.
+        Rounds before first_round count as already played, e.g. the rounds of a
+        live event that were recorded into the tournament's players.
         """
-        self.current_round = 0
-        #TODO: add a progress bar
-        #TODO: simulate many tournaments at once and average the results
+        self.current_round = first_round - 1
+        for listener in self.listeners:
+            listener.on_simulation_start(self)
         
-        for round_num in range(self.tournament.number_of_rounds):
-            round_start = time.time()
+        for round_num in range(first_round - 1, self.tournament.number_of_rounds):
             self.current_round = round_num + 1
-            self._simulate_round()
-            round_end = time.time()
-            round_time = round_end - round_start
-            print(f"Round {self.current_round} completed in {round_time:.2f} seconds")
+            round_event = self._simulate_round()
+            self.unpaired += round_event.unpaired
+            self.history.end_round(self.current_round)
+            for listener in self.listeners:
+                listener.on_round_end(self, round_event)
+
+        # Everything is recorded, so the history can let go of open files
+        self.history.close()
+        # Tiebreakers are only needed for the final standings, refresh them once
+        self.tournament.refresh_tiebreakers()
+        for listener in self.listeners:
+            listener.on_simulation_end(self)
             
-    def _get_lowest_scoring_player(self, available_players: List['Player']) -> Optional['Player']:
+    def summary(self, cuts: Sequence[int] = (8, 16, 32), top: int = 0) -> Dict:
+        """
+        JSON-ready summary of the simulation: its parameters, rounds, matches,
+        unpaired players, the points and tiebreaker of the last player making
+        each cut and the top players of the standings.
+        """
+        rankings = self.tournament.rankings()
+        cut_lines = {}
+        for cut in cuts:
+            if cut <= len(rankings):
+                last_in = rankings.player_at_rank(cut)
+                cut_lines[str(cut)] = {"points": last_in.get_points(), "tiebreaker": last_in.calculate_tiebreaker()}
+        return {
+            "players": self.tournament.number_of_players,
+            "draw_percentage": self.tournament.draw_percentage,
+            "seed": self.seed,
+            "pairing": self.pairing,
+            "rounds": self.tournament.number_of_rounds,
+            "matches": self.match_count,
+            "unpaired": self.unpaired,
+            "cut_lines": cut_lines,
+            "top": [{"player": p.player_id, "points": p.get_points(),
+                     "record": f"{p.wins}-{p.losses}-{p.draws}"} for p in rankings.top(top)],
+        }
+
+    def _get_lowest_scoring_player(self, player_ids: List[int], points: Sequence[int]) -> Optional[int]:
         """Returns the player with the lowest total score who hasn't had a bye."""
-        eligible_players = [p for p in available_players if not p.has_had_bye]
-        if not eligible_players:
+        had_byes = self.tournament.had_byes()
+        eligible_ids = [i for i in player_ids if not had_byes[i]]
+        if not eligible_ids:
             # If all players have had byes, pick the lowest scoring from available
-            return min(available_players, key=lambda p: (p.get_points(), p.calculate_tiebreaker()))
-        return min(eligible_players, key=lambda p: (p.get_points(), p.calculate_tiebreaker()))
-    
-    def _find_best_opponent(self, player: 'Player', available_players: List['Player']) -> Optional['Player']:
+            eligible_ids = player_ids
+        # Only the players on the lowest score need their tiebreaker
+        lowest_points = min(points[i] for i in eligible_ids)
+        lowest_ids = [i for i in eligible_ids if points[i] == lowest_points]
+        players = self.tournament.players
+        return min(lowest_ids, key=lambda i: players[i].tiebreaker_key())
+
+    def _find_best_opponent(self, player_id: int, available_ids: List[int], points: Sequence[int]) -> Optional[int]:
         """
         Find the best opponent for the given player.
         First priority: Haven't played against each other
         Second priority: Score difference no more than 3
         Third priority: Closest score within allowed range
         """
-        # Get all valid opponents (not played against yet)
-        valid_opponents = [p for p in available_players 
-                         if p != player 
-                         and not player.has_played_against(p)
-                         and abs(p.get_points() - player.get_points()) <= 3]  # Score difference check
+        # Get all valid opponents (not played against yet), in one batch query
+        unplayed = self.tournament.rematch_index.unplayed_mask(player_id, np.array(available_ids, dtype=np.int32))
+        unplayed_opponents = [i for i, is_unplayed in zip(available_ids, unplayed)
+                              if is_unplayed and i != player_id]
+        player_points = points[player_id]
+        valid_opponents = [i for i in unplayed_opponents
+                           if abs(points[i] - player_points) <= 3]  # Score difference check
         
         if not valid_opponents:
             # If no opponents within 3 points, try again without score restriction
-            valid_opponents = [p for p in available_players 
-                             if p != player 
-                             and not player.has_played_against(p)]
+            valid_opponents = unplayed_opponents
             if not valid_opponents:
                 return None
         
         # Group valid opponents by points
         opponents_by_points = {}
-        for p in valid_opponents:
-            points = p.get_points()
-            if points not in opponents_by_points:
-                opponents_by_points[points] = []
-            opponents_by_points[points].append(p)
+        for i in valid_opponents:
+            opponent_points = points[i]
+            if opponent_points not in opponents_by_points:
+                opponents_by_points[opponent_points] = []
+            opponents_by_points[opponent_points].append(i)
         
         # Find closest point total that has available opponents
-        player_points = player.get_points()
         point_totals = sorted(opponents_by_points.keys())
         closest_points = min(point_totals, key=lambda x: abs(x - player_points))
         
         # Return random player from the closest points group
-        return random.choice(opponents_by_points[closest_points])
+        return self.rng.choice(opponents_by_points[closest_points])
     
-    def _find_valid_pairing(self, available_players: List['Player']) -> Tuple[Optional['Player'], Optional['Player']]:
+    def _find_valid_pairing(self, available_ids: List[int], points: Sequence[int]) -> Tuple[Optional[int], Optional[int]]:
         """
         Find a valid pairing of players who haven't played each other yet.
         Tries all possible combinations to ensure no players are left out unnecessarily.
         """
-        if len(available_players) < 2:
+        if len(available_ids) < 2:
             return None, None
         
         # Sort players by number of potential opponents (ascending)
         # This helps match players with fewer options first
-        players_by_options = []
-        for player in available_players:
-            valid_opponents = sum(1 for p in available_players 
-                                if p != player and not player.has_played_against(p))
-            players_by_options.append((valid_opponents, player))
+        # Opponents already played within the available players are counted for everyone at once
+        index = self.tournament.rematch_index
+        player_ids = np.array(available_ids, dtype=np.int32)
+        played_within = index.count_played_within(player_ids, index.member_mask(player_ids))
+        players_by_options = [(len(available_ids) - 1 - played, player_id)
+                              for played, player_id in zip(played_within.tolist(), available_ids)]
         
         # Sort by number of valid opponents (first element of tuple)
         players_by_options.sort(key=lambda x: x[0])  # Sort by the opponent count
         
-        # Try each player as potential first player, starting with those with fewest options
-        for _, player1 in players_by_options:
-            opponent = self._find_best_opponent(player1, available_players)
-            if opponent:
+        # Try each player as potential first player, starting with those with fewest options.
+        # Players without options can't be paired directly, CompletePairing takes care of them
+        for options, player1 in players_by_options:
+            if options == 0:
+                continue
+            opponent = self._find_best_opponent(player1, available_ids, points)
+            if opponent is not None:
                 return player1, opponent
         
         return None, None
             
-    def _simulate_round(self) -> None:
+    def _simulate_round(self) -> RoundEvent:
         """
         Simulates a single round of matches between players.
         Matches players with similar win counts who haven't played each other yet.
+        Players are handled by player_id on a points list taken at the start of
+        the round, and the round's matches are recorded together at the end.
+        Returns the timings and counts of the round.
         """
-        available_players = self.tournament.players.copy()
-        random.shuffle(available_players)  # Randomize initial player order
+        event = RoundEvent(self.current_round, self.tournament.number_of_rounds)
+        round_start = phase_start = time.perf_counter()
+        available_ids = list(range(self.tournament.number_of_players))
+        self.rng.shuffle(available_ids)  # Randomize initial player order
+        points = self.tournament.points()
+        records: List[Tuple[int, int, int, int]] = []
         
         # Handle odd number of players
-        if len(available_players) % 2 == 1:
-            lowest_scorer = self._get_lowest_scoring_player(available_players)
-            if lowest_scorer:
-                available_players.remove(lowest_scorer)
+        if len(available_ids) % 2 == 1:
+            lowest_scorer = self._get_lowest_scoring_player(available_ids, points)
+            if lowest_scorer is not None:
+                available_ids.remove(lowest_scorer)
                 
                 # Create a bye match
-                bye_match = Match(lowest_scorer, None, lowest_scorer, self.current_round)
-                self.matches.append(bye_match)
-                lowest_scorer.wins += 1
-                lowest_scorer.has_had_bye = True
-                lowest_scorer.match_history.append(bye_match)
+                records.append((lowest_scorer, -1, lowest_scorer, self.current_round))
+                event.byes = 1
+        phase_start = self._end_phase(event, "bye", phase_start, event.byes)
+
         # Create matches between remaining players
+        pairs, unpaired = self._pair_players(available_ids, points)
+        paired_before = len(pairs)
+        pairs, unpaired, event.pairing_complete = self.completer.complete(available_ids, points, pairs, unpaired)
+        event.pairs = len(pairs)
+        event.repaired = len(pairs) - paired_before
+        event.unpaired = len(unpaired)
+        phase_start = self._end_phase(event, "pairing", phase_start, event.pairs)
+
+        records.extend(self._generate_result(player1, player2) for player1, player2 in pairs)
+        event.rng_draws = len(pairs)
+        phase_start = self._end_phase(event, "results", phase_start, event.rng_draws)
+
+        self._record_round(np.array(records, dtype=RECORD_DTYPE))
+        self._end_phase(event, "stats", phase_start, len(records))
+
+        event.seconds = time.perf_counter() - round_start
+        return event
+
+    def _end_phase(self, event: RoundEvent, phase: str, start: float, count: int) -> float:
+        """Record the time of a phase and notify listeners. Returns the end time."""
+        end = time.perf_counter()
+        event.phase_seconds[phase] = end - start
+        if self.listeners:
+            phase_event = PhaseEvent(event.round_number, phase, start, end - start, count)
+            for listener in self.listeners:
+                listener.on_phase(self, phase_event)
+        return end
+
+    def _pair_players(self, available_ids: List[int], points: Sequence[int]) -> Tuple[List[Tuple[int, int]], List[int]]:
+        """Pair the available players. Returns the pairs and the players left unpaired."""
+        if self.pairer is not None:
+            return self.pairer.pair(available_ids, points)
+
         #TODO: speed up this somehow...
-        while len(available_players) >= 2:
-            player1, player2 = self._find_valid_pairing(available_players)
+        pairs = []
+        available_ids = available_ids.copy()
+        while len(available_ids) >= 2:
+            player1, player2 = self._find_valid_pairing(available_ids, points)
             if player1 is None or player2 is None:
-                # No valid pairings found among remaining players
+                # Everyone left has played everyone else left
                 break
-            available_players.remove(player1)
-            available_players.remove(player2)
-            
-            # Generate random number between 0 and 100
-            random_number = random.randint(0, 100)
-            
-            # Determine match result
-            if random_number < self.tournament.draw_percentage:
-                result = None
-            else:
-                result = player1 if player1.player_id < player2.player_id else player2
-            
-            # Create match with result
-            match = Match(player1, player2, result, self.current_round)
-            self.matches.append(match)
-            
-            # Update player statistics
-            if result is None:
-                player1.draws += 1
-                player2.draws += 1
-            else:
-                winner = result
-                loser = player2 if winner == player1 else player1
-                winner.wins += 1
-                loser.losses += 1
-            
-            # Record that these players have faced each other
-            player1.add_opponent(player2)
-            player2.add_opponent(player1)
-            
-            # Add match to both players' match history
-            player1.match_history.append(match)
-            player2.match_history.append(match)
\ No newline at end of file
+            available_ids.remove(player1)
+            available_ids.remove(player2)
+            pairs.append((player1, player2))
+        return pairs, available_ids
+
+    def _generate_result(self, player1: int, player2: int) -> Tuple[int, int, int, int]:
+        """
+        Generate a random result for the given pairing, as a match record:
+        player1, player2, the winner (-1 for a draw) and the round number.
+        """
+        # Generate random number between 0 and 100
+        random_number = self.rng.randint(0, 100)
+        
+        # Determine match result
+        if random_number < self.tournament.draw_percentage:
+            result = -1
+        else:
+            result = min(player1, player2)
+        
+        return player1, player2, result, self.current_round
+
+    def _record_round(self, records: np.ndarray) -> None:
+        """
+        Store the matches of a round, given as RECORD_DTYPE records, and update
+        the statistics of the players in them. Compact storage takes the whole
+        round at once; Player objects record Match by Match.
+        """
+        store = self.tournament.player_store
+        if store is not None:
+            store.record_records(records)
+            self.history.record_records(records)
+            return
+        for match in records_to_matches(records, self.tournament.players):
+            self._record_match(match)
+
+    def _record_match(self, match: Match) -> None:
+        """Store a match (or bye) and update the statistics of the players in it."""
+        self.history.record(match)
+        
+        # Update player statistics, opponents and match history
+        match.player1.record_match(match, self.history.keeps_player_history)
+        if match.player2 is not None:
+            match.player2.record_match(match, self.history.keeps_player_history)
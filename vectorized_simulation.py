@@ -0,0 +1,230 @@
+from typing import Dict, Optional
+from ranking import pack_keys
+from tournament import Tournament
+from tournament_simulation import Simulation
+import math
+import numpy as np
+
+class BatchSimulation:
+    """
+    Simulates many Swiss tournaments in lockstep.
+    Wins, draws, losses and byes are stored as (tournaments x players) arrays and
+    every round is paired and played with a handful of vectorized operations.
+
+    Uses the same rules as Simulation: the lowest scorer without a bye gets the bye,
+    players are paired by score, rematches are avoided and the lower player_id wins
+    unless the match is a draw. Ties on points are broken randomly instead of by
+    tiebreaker, and rematches are fixed by swapping with the neighbouring pair.
+    All tournaments can start from the same already played matches, see load_records.
+    """
+    def __init__(self, number_of_players: int, draw_percentage: int, number_of_tournaments: int,
+                 seed: Optional[int] = None, max_repair_passes: int = 8,
+                 number_of_rounds: Optional[int] = None):
+        self.number_of_players = number_of_players
+        self.draw_percentage = draw_percentage
+        self.number_of_tournaments = number_of_tournaments
+        if number_of_rounds is None:
+            number_of_rounds = math.ceil(math.log2(number_of_players))
+        self.number_of_rounds = number_of_rounds
+        self.max_repair_passes = max_repair_passes
+        self.rng = np.random.default_rng(seed)
+
+        shape = (number_of_tournaments, number_of_players)
+        self.wins = np.zeros(shape, dtype=np.int16)
+        self.draws = np.zeros(shape, dtype=np.int16)
+        self.losses = np.zeros(shape, dtype=np.int16)
+        self.has_had_bye = np.zeros(shape, dtype=bool)
+        self.loss_rounds_sum = np.zeros(shape, dtype=np.int32)
+        # Opponent of every player in every round, -1 for byes and rounds not played yet
+        self.opponents = np.full(shape + (self.number_of_rounds,), -1, dtype=np.int32)
+        self.rematches = 0  # Rematches that couldn't be repaired
+        self.current_round = 0
+
+    def get_points(self) -> np.ndarray:
+        """Points of every player in every tournament."""
+        return self.wins.astype(np.int32) * 3 + self.draws
+
+    def load_records(self, records: np.ndarray) -> None:
+        """
+        Start every tournament from the same played matches, given as
+        match_history.RECORD_DTYPE records, e.g. the results of a live event.
+        """
+        n = self.number_of_players
+        player1 = records['player1'].astype(np.int64)
+        player2 = records['player2'].astype(np.int64)
+        result = records['result'].astype(np.int64)
+        round_number = records['round_number'].astype(np.int64)
+        bye = player2 < 0
+        draw = result < 0
+        decided = ~bye & ~draw
+        loser = np.where(result == player1, player2, player1)[decided]
+
+        self.wins[:] = np.bincount(result[~draw], minlength=n)  # Byes count as wins
+        self.draws[:] = np.bincount(np.concatenate([player1[draw], player2[draw]]), minlength=n)
+        self.losses[:] = np.bincount(loser, minlength=n)
+        self.loss_rounds_sum[:] = np.bincount(loser, weights=round_number[decided] ** 2, minlength=n)
+        self.has_had_bye[:] = np.bincount(player1[bye], minlength=n) > 0
+        played = ~bye
+        self.opponents[:] = -1
+        self.opponents[:, player1[played], round_number[played] - 1] = player2[played]
+        self.opponents[:, player2[played], round_number[played] - 1] = player1[played]
+        self.current_round = int(round_number.max()) if len(records) else 0
+
+    def simulate(self, first_round: int = 1) -> None:
+        """Simulates all rounds of all tournaments, from first_round on."""
+        self.current_round = first_round - 1
+        for round_num in range(first_round - 1, self.number_of_rounds):
+            self.current_round = round_num + 1
+            self._simulate_round()
+
+    def _simulate_round(self) -> None:
+        """Simulates a single round of every tournament."""
+        tournaments = np.arange(self.number_of_tournaments)
+        rows = tournaments[:, None]
+        points = self.get_points()
+        # Random noise below one point breaks ties without reordering score groups
+        sort_key = points + self.rng.random(points.shape)
+
+        if self.number_of_players % 2 == 1:
+            # Players who had a bye are pushed past everyone else
+            bye_key = sort_key + self.has_had_bye * (3 * self.number_of_rounds + 1)
+            bye_players = np.argmin(bye_key, axis=1)
+            self.wins[tournaments, bye_players] += 1
+            self.has_had_bye[tournaments, bye_players] = True
+            sort_key[tournaments, bye_players] = -np.inf
+
+        # Highest score first; the bye player, if any, ends up last and is dropped
+        order = np.argsort(-sort_key, axis=1)[:, :self.number_of_players - self.number_of_players % 2]
+        player1 = order[:, 0::2]
+        player2 = order[:, 1::2]
+        self._avoid_rematches(player1, player2)
+
+        round_index = self.current_round - 1
+        self.opponents[rows, player1, round_index] = player2
+        self.opponents[rows, player2, round_index] = player1
+
+        # Same draw as random.randint(0, 100) < draw_percentage
+        is_draw = self.rng.integers(0, 101, size=player1.shape) < self.draw_percentage
+        is_win = ~is_draw
+        winners = np.minimum(player1, player2)
+        losers = np.maximum(player1, player2)
+        # Each player appears at most once per row, so plain fancy indexing is safe
+        self.draws[rows, player1] += is_draw
+        self.draws[rows, player2] += is_draw
+        self.wins[rows, winners] += is_win
+        self.losses[rows, losers] += is_win
+        self.loss_rounds_sum[rows, losers] += is_win * self.current_round * self.current_round
+
+    def _has_played(self, player1: np.ndarray, player2: np.ndarray) -> np.ndarray:
+        """Which pairs (tournaments x pairs) have already played each other."""
+        rows = np.arange(self.number_of_tournaments)[:, None]
+        return (self.opponents[rows, player1] == player2[..., None]).any(axis=-1)
+
+    def _avoid_rematches(self, player1: np.ndarray, player2: np.ndarray) -> None:
+        """
+        Fix rematches in place by swapping partners with a nearby pair:
+        (a, b), (c, d) becomes (a, c), (b, d) or (a, d), (b, c), whichever has no rematch.
+        Pairs further away are tried when the neighbours don't help, and each pass
+        only touches every other block of pairs so swaps never overlap.
+        """
+        number_of_pairs = player1.shape[1]
+        for offset in range(1, min(self.max_repair_passes, number_of_pairs - 1) + 1):
+            for parity in (0, 1):
+                rematch = self._has_played(player1, player2)
+                if not rematch.any():
+                    return
+                tournament_index, pair_index = np.nonzero(rematch)
+                # Pairs at the end swap with the pair before them instead
+                pair_index = np.where(pair_index + offset < number_of_pairs, pair_index, pair_index - offset)
+                selected = (pair_index // offset) % 2 == parity
+                self._swap_partners(player1, player2, tournament_index[selected],
+                                    pair_index[selected], pair_index[selected] + offset)
+        self.rematches += int(self._has_played(player1, player2).sum())
+
+    def _swap_partners(self, player1: np.ndarray, player2: np.ndarray, tournament_index: np.ndarray,
+                       first: np.ndarray, second: np.ndarray) -> None:
+        """Swap partners between the given pairs where that removes the rematch."""
+        a = player1[tournament_index, first]
+        b = player2[tournament_index, first]
+        c = player1[tournament_index, second]
+        d = player2[tournament_index, second]
+        played = self.opponents[tournament_index]  # (swaps x players x rounds)
+        swaps = np.arange(len(tournament_index))
+
+        def unplayed(x, y):
+            return ~(played[swaps, x] == y[:, None]).any(axis=-1)
+
+        cross = unplayed(a, c) & unplayed(b, d)
+        diagonal = ~cross & unplayed(a, d) & unplayed(b, c)
+        player2[tournament_index[cross], first[cross]] = c[cross]
+        player1[tournament_index[cross], second[cross]] = b[cross]
+        player2[tournament_index[diagonal], first[diagonal]] = d[diagonal]
+        player2[tournament_index[diagonal], second[diagonal]] = b[diagonal]
+
+    def ranking_keys(self) -> np.ndarray:
+        """
+        Packed ranking key (see ranking.pack_keys) of every player in every
+        tournament, with the tiebreakers computed from the opponents arrays.
+        """
+        rows = np.arange(self.number_of_tournaments)[:, None, None]
+        matches = self.wins + self.losses + self.draws
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_percentage = np.where(matches > 0, (self.wins + self.draws / 2) / matches * 100, 0.0)
+        played = self.opponents >= 0
+        opponents = np.where(played, self.opponents, 0)
+        opponent_count = played.sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            opp_winrate = np.where(opponent_count > 0,
+                                   np.where(played, win_percentage[rows, opponents], 0.0).sum(axis=-1) / opponent_count,
+                                   0.0)
+            # Opponents without opponents of their own are left out, like in Player
+            counted = played & (opponent_count[rows, opponents] > 0)
+            opp_opp_count = counted.sum(axis=-1)
+            opp_opp_winrate = np.where(opp_opp_count > 0,
+                                       np.where(counted, opp_winrate[rows, opponents], 0.0).sum(axis=-1) / opp_opp_count,
+                                       0.0)
+        has_opponents = opponent_count > 0
+        return pack_keys(
+            self.get_points(),
+            np.where(has_opponents, np.round(opp_winrate * 10), 0),
+            np.where(has_opponents, np.round(opp_opp_winrate * 10), 0),
+            np.where(has_opponents, np.minimum(self.loss_rounds_sum, 999), 0),
+        )
+
+    def top_indices(self, k: int) -> np.ndarray:
+        """Indices of the k best players of every tournament (tournaments x k), best first."""
+        keys = self.ranking_keys()
+        k = min(k, self.number_of_players)
+        if k <= 0:
+            return np.empty((self.number_of_tournaments, 0), dtype=np.intp)
+        # Everyone above the k-th best key, then the first players (by index) on it,
+        # so ties at the cut resolve in player order like in Rankings
+        kth = -np.partition(-keys, k - 1, axis=1)[:, k - 1:k]
+        above = keys > kth
+        tied = keys == kth
+        places_left = k - above.sum(axis=1, keepdims=True)
+        selected = above | (tied & (np.cumsum(tied, axis=1) <= places_left))
+        top = np.nonzero(selected)[1].reshape(self.number_of_tournaments, k)  # Ascending index per row
+        order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(top, order, axis=1)
+
+    def average_point_distribution(self) -> Dict[int, float]:
+        """Average number of players finishing on each point total."""
+        points = self.get_points()
+        counts = np.bincount(points.ravel())
+        return {total: count / self.number_of_tournaments
+                for total, count in enumerate(counts.tolist()) if count}
+
+def sample_point_distribution(number_of_players: int, draw_percentage: int, runs: int,
+                              seed: int = 0, pairing: str = "bucket") -> Dict[int, float]:
+    """
+    Average number of players on each point total over runs of the object-based
+    Simulation, to check BatchSimulation against.
+    """
+    totals: Dict[int, int] = {}
+    for run_index in range(runs):
+        tournament = Tournament(number_of_players, draw_percentage)
+        Simulation(tournament, pairing, history="stats", seed=f"{seed}-{run_index}").simulate()
+        for player in tournament.players:
+            totals[player.get_points()] = totals.get(player.get_points(), 0) + 1
+    return {points: totals[points] / runs for points in sorted(totals)}